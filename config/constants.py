@@ -1,10 +1,54 @@
 """常量配置模块"""
+import os
 
 
 # 默认视频参数
 DEFAULT_FPS = 30
 DEFAULT_FRAME_SKIP = 10
 
+# 解码流水线参数
+PIPELINE_DEFAULTS = {
+    "max_workers": min(8, os.cpu_count() or 1),
+    "queue_size": 32,
+    "processes": os.cpu_count() or 1
+}
+
+# 指纹缓存配置: 只缓存哈希和宽度不超过max_thumb_width的亮度缩略图，
+# 缓存总大小超过max_bytes时删除最久未使用的视频的缓存
+FINGERPRINT_CACHE = {
+    "enabled": True,
+    "dir": os.path.join(os.path.expanduser("~"), ".video_similar_frame_tool", "cache"),
+    "max_thumb_width": 64,
+    "max_bytes": 512 * 1024 * 1024
+}
+
+# 片段导出配置: 剪切点对齐关键帧时优先无损复制 (需要PyAV)；
+# 批量导出时与下一个片段相距超过max_gap_frames帧则直接定位，否则顺序跳过；
+# 同时打开的输出文件不超过max_writers个
+SEGMENT_EXPORT_DEFAULTS = {
+    "stream_copy": True,
+    "max_gap_frames": 300,
+    "max_writers": 8
+}
+
+# 批量帧导出配置
+FRAME_EXPORT_DEFAULTS = {
+    "format": "jpg",
+    "jpeg_quality": 95,
+    "png_compression": 3
+}
+
+# 帧预览配置: 缓存的预览图数量、选中结果时前后各预取的行数
+PREVIEW_DEFAULTS = {
+    "cache_size": 64,
+    "prefetch_rows": 2
+}
+
+# 界面刷新配置: 工作线程的进度更新按此间隔 (毫秒) 合并后应用到界面
+UI_UPDATE_DEFAULTS = {
+    "interval_ms": 50
+}
+
 # UI样式配置
 UI_STYLES = {
     "TFrame": {"background": "#f0f0f0"},
@@ -21,7 +65,24 @@ SIMILAR_FRAME_DEFAULTS = {
     "threshold": 0.15,
     "min_threshold": 0.05,
     "max_threshold": 0.3,
-    "frame_skip": 10
+    "frame_skip": 10,
+    "search_method": "matrix",
+    "result_mode": "pairs",
+    # 只比较时间间隔不超过该秒数的帧 (边解码边查找)，0为不限
+    "max_time_gap": 0,
+    "max_time_gap_limit": 3600
+}
+
+# 相似帧查找方式 (显示名称 -> 方法)
+SIMILAR_SEARCH_METHODS = {
+    "分块矩阵": "matrix",
+    "多索引哈希": "index"
+}
+
+# 相似帧结果形式 (显示名称 -> 模式): 逐对列出，或把互相相似的帧合并为一组
+SIMILAR_RESULT_MODES = {
+    "帧对": "pairs",
+    "相似帧分组": "clusters"
 }
 
 # 首帧比较默认参数
@@ -38,5 +99,41 @@ LOOPING_VIDEO_DEFAULTS = {
     "min_ssim_threshold": 0.5,
     "max_ssim_threshold": 0.99,
     "frame_skip": 30,
-    "search_range": 300
+    "search_range": 300,
+    "analysis_width": 480,
+    "engine": "window",
+    # 级联预筛选 (默认关闭): 直方图总变差距离和哈希汉明距离超过上限的候选不再计算SSIM，
+    # 上限与SSIM阈值无关，可能漏掉SSIM达标的循环；直方图几乎不淘汰候选，默认不启用 (None)
+    "cascade": {
+        "enabled": False,
+        "histogram_max_distance": None,
+        "hash_max_distance": 20
+    },
+    # 自相似矩阵: 描述子宽度、最短循环长度 (帧)、保留的循环数量、分块大小、去重半径 (帧)
+    "self_similarity": {
+        "descriptor_width": 32,
+        "min_loop_frames": 30,
+        "top_k": 50,
+        "tile_size": 1024,
+        "suppression_frames": 30
+    },
+    # 近似最近邻: 描述子宽度、哈希表数量、每表比特数、每帧最多比较的候选数
+    "ann": {
+        "descriptor_width": 32,
+        "num_tables": 8,
+        "num_bits": 12,
+        "max_candidates": 16
+    },
+    # 循环点精修: 网格搜索使用的宽度、以分析宽度复核的组合数量
+    "refine": {
+        "search_width": 160,
+        "verify_count": 3
+    }
+}
+
+# 循环检测方式 (显示名称 -> 方法)
+LOOPING_ENGINES = {
+    "逐帧窗口": "window",
+    "自相似矩阵": "matrix",
+    "近似最近邻": "ann"
 }
\ No newline at end of file
@@ -2,6 +2,7 @@ import tkinter as tk
 from tkinter import ttk, messagebox
 import sys
 import os
+import multiprocessing
 
 # 添加必要的导入
 try:
@@ -20,7 +21,8 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 from ui.similar_frame_tab import SimilarFrameTab
 from ui.first_frame_tab import FirstFrameTab
 from ui.looping_video_tab import LoopingVideoTab
-from config.constants import UI_STYLES
+from utils.fingerprint_cache import clear_cache
+from config.constants import UI_STYLES, FINGERPRINT_CACHE
 
 
 class VideoAnalysisTool:
@@ -35,6 +37,9 @@ class VideoAnalysisTool:
         for style_name, style_config in UI_STYLES.items():
             self.style.configure(style_name, **style_config)
 
+        # 设置菜单
+        self.create_menu()
+
         # 创建主框架
         self.main_frame = ttk.Frame(root)
         self.main_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
@@ -58,8 +63,33 @@ class VideoAnalysisTool:
         self.first_frame_module = FirstFrameTab(self.first_frame_tab)
         self.looping_video_module = LoopingVideoTab(self.looping_video_tab)
 
+    def create_menu(self):
+        """创建设置菜单: 指纹缓存开关和清除缓存"""
+        menubar = tk.Menu(self.root)
+        settings_menu = tk.Menu(menubar, tearoff=0)
+
+        self.cache_enabled_var = tk.BooleanVar(value=FINGERPRINT_CACHE["enabled"])
+        settings_menu.add_checkbutton(label="使用指纹缓存", variable=self.cache_enabled_var,
+                                      command=self.toggle_cache)
+        settings_menu.add_command(label="清除指纹缓存", command=self.clear_fingerprint_cache)
+
+        menubar.add_cascade(label="设置", menu=settings_menu)
+        self.root.config(menu=menubar)
+
+    def toggle_cache(self):
+        """切换指纹缓存，之后开始的分析按新设置读写缓存"""
+        FINGERPRINT_CACHE["enabled"] = self.cache_enabled_var.get()
+
+    def clear_fingerprint_cache(self):
+        """删除所有指纹缓存"""
+        clear_cache()
+        messagebox.showinfo("完成", f"已清除指纹缓存:\n{FINGERPRINT_CACHE['dir']}")
+
 
 if __name__ == "__main__":
+    # 打包后的程序使用多进程分段解码时需要
+    multiprocessing.freeze_support()
+
     # 检查必要的依赖
     try:
         import cv2
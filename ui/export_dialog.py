@@ -0,0 +1,84 @@
+import tkinter as tk
+from tkinter import ttk, filedialog, messagebox
+
+from config.constants import FRAME_EXPORT_DEFAULTS
+
+
+class FrameExportDialog:
+    """批量导出帧的设置对话框: 输出目录、图片格式、JPEG质量和PNG压缩级别"""
+
+    def __init__(self, parent, frame_count):
+        self.result = None
+
+        self.window = tk.Toplevel(parent)
+        self.window.title("批量导出帧")
+        self.window.resizable(False, False)
+        self.window.transient(parent.winfo_toplevel())
+
+        frame = ttk.Frame(self.window, padding=10)
+        frame.pack(fill=tk.BOTH, expand=True)
+
+        ttk.Label(frame, text=f"共 {frame_count} 帧", style="Header.TLabel").pack(anchor=tk.W, pady=(0, 5))
+
+        # 输出目录
+        ttk.Label(frame, text="输出目录:").pack(anchor=tk.W, pady=2)
+        self.output_dir_var = tk.StringVar()
+        ttk.Entry(frame, textvariable=self.output_dir_var, width=40).pack(fill=tk.X, pady=2)
+        ttk.Button(frame, text="浏览...", command=self.browse_dir).pack(fill=tk.X, pady=2)
+
+        # 图片格式
+        ttk.Label(frame, text="图片格式:").pack(anchor=tk.W, pady=2)
+        self.format_var = tk.StringVar(value=FRAME_EXPORT_DEFAULTS["format"])
+        ttk.Combobox(frame, textvariable=self.format_var, values=["jpg", "png"],
+                     state="readonly", width=10).pack(fill=tk.X, pady=2)
+
+        # JPEG质量
+        ttk.Label(frame, text="JPEG质量 (1-100):").pack(anchor=tk.W, pady=2)
+        self.jpeg_quality_var = tk.IntVar(value=FRAME_EXPORT_DEFAULTS["jpeg_quality"])
+        ttk.Spinbox(frame, from_=1, to=100, textvariable=self.jpeg_quality_var, width=10).pack(fill=tk.X, pady=2)
+
+        # PNG压缩级别
+        ttk.Label(frame, text="PNG压缩级别 (0-9):").pack(anchor=tk.W, pady=2)
+        self.png_compression_var = tk.IntVar(value=FRAME_EXPORT_DEFAULTS["png_compression"])
+        ttk.Spinbox(frame, from_=0, to=9, textvariable=self.png_compression_var, width=10).pack(fill=tk.X, pady=2)
+
+        # 操作按钮
+        button_frame = ttk.Frame(frame)
+        button_frame.pack(fill=tk.X, pady=(10, 0))
+        ttk.Button(button_frame, text="导出", command=self.confirm).pack(side=tk.LEFT, expand=True, fill=tk.X, padx=2)
+        ttk.Button(button_frame, text="取消", command=self.window.destroy).pack(side=tk.LEFT, expand=True,
+                                                                              fill=tk.X, padx=2)
+
+        self.window.grab_set()
+
+    def browse_dir(self):
+        """选择输出目录"""
+        output_dir = filedialog.askdirectory(parent=self.window)
+        if output_dir:
+            self.output_dir_var.set(output_dir)
+
+    def confirm(self):
+        """校验设置并关闭对话框"""
+        if not self.output_dir_var.get():
+            messagebox.showerror("错误", "请选择输出目录", parent=self.window)
+            return
+
+        try:
+            jpeg_quality = min(100, max(1, self.jpeg_quality_var.get()))
+            png_compression = min(9, max(0, self.png_compression_var.get()))
+        except tk.TclError:
+            messagebox.showerror("错误", "请输入有效的数值", parent=self.window)
+            return
+
+        self.result = {
+            "output_dir": self.output_dir_var.get(),
+            "image_format": self.format_var.get(),
+            "jpeg_quality": jpeg_quality,
+            "png_compression": png_compression
+        }
+        self.window.destroy()
+
+    def show(self):
+        """等待对话框关闭，返回导出设置，取消时返回None"""
+        self.window.wait_window()
+        return self.result
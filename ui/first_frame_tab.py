@@ -1,11 +1,26 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 import cv2
+import numpy as np
 from PIL import Image, ImageTk
 import threading
-
-from utils.helpers import frame_to_time, calculate_frame_hash, sort_treeview
-from config.constants import FIRST_FRAME_DEFAULTS
+import os
+
+from utils.helpers import frame_to_time, calculate_frame_hash
+from utils.fingerprint import hash_to_int, hash_distance, hash_similarity, HASH_BITS
+from utils.hamming import max_accepted_distance
+from utils.score_index import ScoreIndex
+from utils.fingerprint_source import iter_fingerprints
+from utils.segment_export import BatchSegmentExportJob, SegmentExportJob
+from utils.stream_copy import stream_copy_available
+from utils.frame_export import FrameExportJob, imwrite_params
+from ui.export_dialog import FrameExportDialog
+from ui.virtual_tree import VirtualTreeview
+from utils.preview import FramePreviewService, container_size
+from utils.result_table import FIRST_FRAME_DTYPE, ResultFilter, make_table
+from utils.ui_channel import UIChannel
+from config.constants import (FIRST_FRAME_DEFAULTS, PIPELINE_DEFAULTS, SEGMENT_EXPORT_DEFAULTS,
+                              PREVIEW_DEFAULTS)
 
 
 class FirstFrameTab:
@@ -18,12 +33,20 @@ class FirstFrameTab:
         self.video_fps = 30
         self.cap = None
         self.processing = False
-        self.first_frame_pairs = []
+        # 工作线程通过消息通道更新界面
+        self.channel = UIChannel(self.parent)
+        self.preview = None
+        self.export_job = None
+        self.frame_export_job = None
+        self.first_frame_pairs = make_table(FIRST_FRAME_DTYPE)
+        self.first_frame_filter = None
         self.current_selected_frame_index = -1
         self.first_frame_image = None
-        self.original_first_frame_pairs = []
         self.first_frame = None
         self.first_frame_hash = None
+        self.sample_frames = None
+        self.sample_distances = None
+        self.sample_index = None
 
     def init_ui(self):
         """初始化首帧比较标签页"""
@@ -59,6 +82,11 @@ class FirstFrameTab:
                                          textvariable=self.first_frame_skip_var, width=10)
         frame_skip_spinbox.pack(fill=tk.X, pady=2)
 
+        # 多进程分段解码
+        self.first_frame_multiprocess_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(control_frame, text="多进程分段解码",
+                        variable=self.first_frame_multiprocess_var).pack(anchor=tk.W, pady=2)
+
         # 操作按钮
         ttk.Label(control_frame, text="操作:", style="Header.TLabel").pack(anchor=tk.W, pady=(15, 5))
         self.first_frame_process_btn = ttk.Button(control_frame, text="分析首帧相似度",
@@ -95,30 +123,16 @@ class FirstFrameTab:
         # 结果列表
         ttk.Label(result_frame, text="相似帧列表:", style="Header.TLabel").pack(anchor=tk.W, pady=(10, 5))
         columns = ("time", "frame", "similarity")
-        self.first_frame_tree = ttk.Treeview(result_frame, columns=columns, show="headings", selectmode="browse")
+        self.first_frame_tree = VirtualTreeview(result_frame, columns, on_select=self.on_tree_select)
 
         # 定义列
-        self.first_frame_tree.heading("time", text="时间位置",
-                                      command=lambda: sort_treeview(self.first_frame_tree, "time", False))
-        self.first_frame_tree.heading("frame", text="帧号",
-                                      command=lambda: sort_treeview(self.first_frame_tree, "frame", False))
-        self.first_frame_tree.heading("similarity", text="相似度",
-                                      command=lambda: sort_treeview(self.first_frame_tree, "similarity", True))
-
-        # 设置列宽
-        self.first_frame_tree.column("time", width=120, anchor=tk.CENTER)
-        self.first_frame_tree.column("frame", width=80, anchor=tk.CENTER)
-        self.first_frame_tree.column("similarity", width=80, anchor=tk.CENTER)
-
-        # 添加滚动条
-        scrollbar = ttk.Scrollbar(result_frame, orient=tk.VERTICAL, command=self.first_frame_tree.yview)
-        self.first_frame_tree.configure(yscrollcommand=scrollbar.set)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.first_frame_tree.column("time", "时间位置", 120, field="frame",
+                                     formatter=lambda record: frame_to_time(record["frame"], self.video_fps))
+        self.first_frame_tree.column("frame", "帧号", 80)
+        self.first_frame_tree.column("similarity", "相似度", 80,
+                                     formatter=lambda record: f"{record['similarity']:.2f}", reverse=True)
         self.first_frame_tree.pack(fill=tk.BOTH, expand=True)
 
-        # 绑定选择事件
-        self.first_frame_tree.bind("<<TreeviewSelect>>", self.on_tree_select)
-
         # 状态标签
         self.first_frame_result_count_var = tk.StringVar(value="找到 0 个相似帧")
         result_count_label = ttk.Label(result_frame, textvariable=self.first_frame_result_count_var)
@@ -152,10 +166,25 @@ class FirstFrameTab:
         ttk.Button(button_frame, text="导出选定帧",
                    command=self.export_selected_frame).pack(fill=tk.X, pady=2)
 
+        self.export_frames_btn = ttk.Button(button_frame, text="批量导出帧",
+                                            command=self.export_all_frames)
+        self.export_frames_btn.pack(fill=tk.X, pady=2)
+
         self.generate_video_btn = ttk.Button(button_frame, text="生成视频片段",
                                              command=self.generate_video_segment, state=tk.DISABLED)
         self.generate_video_btn.pack(fill=tk.X, pady=2)
 
+        self.export_all_btn = ttk.Button(button_frame, text="导出全部片段",
+                                         command=self.export_all_segments)
+        self.export_all_btn.pack(fill=tk.X, pady=2)
+
+        # 无损剪切 (需要PyAV)
+        copy_available = stream_copy_available()
+        self.first_frame_stream_copy_var = tk.BooleanVar(value=SEGMENT_EXPORT_DEFAULTS["stream_copy"] and copy_available)
+        ttk.Checkbutton(button_frame, text="优先无损剪切" if copy_available else "优先无损剪切 (需要PyAV)",
+                        variable=self.first_frame_stream_copy_var,
+                        state=tk.NORMAL if copy_available else tk.DISABLED).pack(anchor=tk.W, pady=2)
+
         # 创建搜索框
         search_frame = ttk.Frame(result_frame)
         search_frame.pack(fill=tk.X, pady=(5, 0))
@@ -166,6 +195,7 @@ class FirstFrameTab:
         search_entry = ttk.Entry(search_frame, textvariable=self.first_frame_search_var, width=25)
         search_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
         search_entry.insert(0, "输入时间或帧号...")
+        ttk.Label(result_frame, text="支持范围: 100-200、0:01:00-0:02:00、>0.9").pack(anchor=tk.W)
 
         # 现在Treeview已创建，再绑定搜索事件
         self.first_frame_search_var.trace("w", self.filter_results)
@@ -176,6 +206,10 @@ class FirstFrameTab:
         """更新阈值显示标签"""
         self.first_frame_threshold_label.config(text=f"当前值: {self.first_frame_threshold_var.get():.2f}")
 
+        # 已有分析结果时直接按新阈值筛选
+        if not self.processing:
+            self.apply_threshold()
+
     def browse_video(self):
         """浏览视频文件"""
         self.video_path = filedialog.askopenfilename(
@@ -207,12 +241,18 @@ class FirstFrameTab:
         self.first_frame_process_btn.config(state=tk.DISABLED, text="处理中...")
         self.first_frame_status_var.set("开始分析视频...")
         self.first_frame_progress_var.set(0)
-        self.first_frame_tree.delete(*self.first_frame_tree.get_children())
+        self.first_frame_tree.clear()
+
+        # 在界面线程中读取参数，工作线程不访问Tk变量
+        settings = {
+            "frame_skip": self.first_frame_skip_var.get(),
+            "processes": PIPELINE_DEFAULTS["processes"] if self.first_frame_multiprocess_var.get() else 1
+        }
 
         # 在新线程中处理视频
-        threading.Thread(target=self.process_comparison, daemon=True).start()
+        threading.Thread(target=self.process_comparison, args=(settings,), daemon=True).start()
 
-    def process_comparison(self):
+    def process_comparison(self, settings):
         """处理首帧比较的线程函数"""
         try:
             # 获取视频帧率
@@ -225,82 +265,56 @@ class FirstFrameTab:
                 self.video_fps = 30  # 默认帧率
 
             total_frames = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
-            self.first_frame_status_var.set(f"视频帧率: {self.video_fps:.2f} FPS | 总帧数: {total_frames}")
-            self.parent.update()
+            self.channel.set(self.first_frame_status_var, f"视频帧率: {self.video_fps:.2f} FPS | 总帧数: {total_frames}")
 
             # 提取第一帧作为基准
-            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
             ret, self.first_frame = self.cap.read()
             if not ret or self.first_frame is None:
                 raise Exception("无法读取第一帧")
 
             # 显示第一帧
-            self.parent.after(0, self.display_first_frame)
+            self.channel.call(self.display_first_frame)
 
             # 计算第一帧的哈希
             self.first_frame_hash = calculate_frame_hash(self.first_frame)
-            self.first_frame_status_var.set("已获取第一帧，开始比较...")
-            self.parent.update()
-
-            # 比较其他帧
-            self.first_frame_pairs = []
-            frame_skip = self.first_frame_skip_var.get()
-            threshold = self.first_frame_threshold_var.get()
-
-            # 从第1帧开始比较
-            current_frame = 1
-            while current_frame < total_frames:
-                # 跳过一些帧以提高效率
-                if current_frame % frame_skip != 0:
-                    current_frame += 1
-                    continue
-
-                # 获取帧
-                self.cap.set(cv2.CAP_PROP_POS_FRAMES, current_frame)
-                ret, frame = self.cap.read()
-                if not ret:
-                    current_frame += 1
+            self.channel.set(self.first_frame_status_var, "已获取第一帧，开始比较...")
+
+            # 比较其他帧，保存每个采样帧与首帧的距离，之后调整阈值时无需重新分析
+            frame_skip = settings["frame_skip"]
+
+            def report_progress(frame_count):
+                progress = (frame_count / max(1, total_frames)) * 100
+                self.channel.set(self.first_frame_progress_var, progress)
+                self.channel.set(self.first_frame_status_var, f"比较帧: {frame_count}/{total_frames}")
+
+            # 顺序读取采样帧并计算指纹 (单进程流水线或多进程分段)
+            first_hash = hash_to_int(self.first_frame_hash)
+            sample_frames = []
+            sample_distances = []
+            for current_frame, frame_hash, _ in iter_fingerprints(self.video_path, frame_skip, total_frames,
+                                                                  progress_callback=report_progress,
+                                                                  processes=settings["processes"]):
+                # 第0帧为基准帧，从第1帧开始比较
+                if current_frame == 0:
                     continue
 
-                # 计算哈希和相似度
-                frame_hash = calculate_frame_hash(frame)
-                distance = self.first_frame_hash - frame_hash
-                max_distance = len(self.first_frame_hash)
-                similarity = 1 - (distance / max_distance)
+                sample_frames.append(current_frame)
+                sample_distances.append(hash_distance(first_hash, frame_hash))
 
-                # 检查是否超过阈值
-                if similarity > (1 - threshold):
-                    # 计算时间位置
-                    time_pos = frame_to_time(current_frame, self.video_fps)
+            self.sample_frames = np.array(sample_frames, dtype=np.int64)
+            self.sample_distances = np.array(sample_distances, dtype=np.uint8)
+            self.sample_index = ScoreIndex(self.sample_distances)
 
-                    self.first_frame_pairs.append((
-                        current_frame, time_pos, similarity
-                    ))
-
-                # 更新进度
-                progress = (current_frame / total_frames) * 100
-                self.first_frame_progress_var.set(progress)
-
-                if current_frame % 50 == 0:
-                    self.first_frame_status_var.set(f"比较帧: {current_frame}/{total_frames}")
-                    self.parent.update()
-
-                current_frame += 1
-
-            # 完成
-            self.first_frame_status_var.set(f"完成! 找到 {len(self.first_frame_pairs)} 个相似帧")
-            self.first_frame_result_count_var.set(f"找到 {len(self.first_frame_pairs)} 个相似帧")
-
-            # 更新结果列表
-            self.parent.after(0, self.update_result_list)
+            # 按当前阈值生成结果列表
+            self.channel.call(self.apply_threshold)
 
         except Exception as e:
-            self.parent.after(0, lambda: messagebox.showerror("处理错误", str(e)))
+            self.channel.call(messagebox.showerror, "处理错误", str(e))
         finally:
             self.processing = False
             if self.cap:
                 self.cap.release()
-            self.parent.after(0, lambda: self.first_frame_process_btn.config(state=tk.NORMAL, text="分析首帧相似度"))
+            self.channel.call(lambda: self.first_frame_process_btn.config(state=tk.NORMAL, text="分析首帧相似度"))
 
     def display_first_frame(self):
         """显示第一帧预览"""
@@ -333,72 +347,59 @@ class FirstFrameTab:
             self.first_frame_preview_label.image = img_tk
             self.first_frame_image = img_tk
 
-    def update_result_list(self):
-        """更新结果列表"""
-        # 清空现有内容
-        for item in self.first_frame_tree.get_children():
-            self.first_frame_tree.delete(item)
-
-        # 添加新结果
-        for pair in self.first_frame_pairs:
-            frame, time_pos, similarity = pair
-            self.first_frame_tree.insert("", tk.END, values=(
-                time_pos,
-                frame,
-                f"{similarity:.2f}"
-            ))
-
-    def filter_results(self, *args):
-        """过滤结果列表"""
-        # 检查组件是否已初始化
-        if not hasattr(self, 'first_frame_tree') or not hasattr(self, 'first_frame_pairs'):
+    def apply_threshold(self):
+        """在保存的采样帧距离中二分查找满足当前阈值的结果"""
+        if self.sample_index is None:
             return
 
-        search_term = self.first_frame_search_var.get().lower()
-        if not search_term:
-            self.update_result_list()
-            return
+        threshold = self.first_frame_threshold_var.get()
+        selected = self.sample_index.select_at_most(max_accepted_distance(threshold, HASH_BITS))
 
-        # 保存原始结果
-        if not hasattr(self, 'original_first_frame_pairs'):
-            self.original_first_frame_pairs = self.first_frame_pairs.copy()
+        first_frame_pairs = make_table(FIRST_FRAME_DTYPE,
+                                       frame=self.sample_frames[selected],
+                                       similarity=hash_similarity(self.sample_distances[selected]))
 
-        # 过滤结果
-        filtered_pairs = []
-        for pair in self.original_first_frame_pairs:
-            frame, time_pos, similarity = pair
-            if (search_term in time_pos.lower() or
-                    search_term in str(frame)):
-                filtered_pairs.append(pair)
+        # 完成
+        self.first_frame_pairs = first_frame_pairs
+        self.first_frame_status_var.set(f"完成! 找到 {len(first_frame_pairs)} 个相似帧")
+        self.first_frame_result_count_var.set(f"找到 {len(first_frame_pairs)} 个相似帧")
 
-        # 更新列表
-        self.first_frame_pairs = filtered_pairs
+        # 更新结果列表
         self.update_result_list()
-        self.first_frame_result_count_var.set(f"找到 {len(filtered_pairs)} 个匹配结果")
 
-    def on_tree_select(self, event):
-        """当选择结果项时"""
-        selected = self.first_frame_tree.selection()
-        if not selected:
+    def update_result_list(self):
+        """更新结果列表，保留当前的搜索条件"""
+        self.first_frame_filter = ResultFilter(self.first_frame_pairs, self.video_fps, ("frame",), "similarity")
+        self.first_frame_tree.set_data(self.first_frame_pairs)
+        self.filter_results()
+
+    def filter_results(self, *args):
+        """按搜索框过滤结果列表 (帧号/时间/相似度范围或子串)"""
+        # 检查组件是否已初始化
+        if not hasattr(self, 'first_frame_tree') or getattr(self, 'first_frame_filter', None) is None:
             return
 
-        item = self.first_frame_tree.item(selected[0])
-        values = item['values']
+        rows = self.first_frame_filter.match(self.first_frame_search_var.get())
+        self.first_frame_tree.set_order(rows)
+        if rows is None:
+            self.first_frame_result_count_var.set(f"找到 {len(self.first_frame_pairs)} 个相似帧")
+        else:
+            self.first_frame_result_count_var.set(f"找到 {len(rows)} 个匹配结果")
 
-        if not values or len(values) < 2:
+    def on_tree_select(self):
+        """当选择结果项时"""
+        record = self.first_frame_tree.selected_record()
+        if record is None:
             return
 
-        # 获取帧号
-        try:
-            frame = int(values[1])
-        except (ValueError, IndexError):
-            return
+        frame = int(record["frame"])
 
         # 显示图像
         self.display_selected_frame(frame)
+        self.prefetch_neighbours()
 
         # 更新时间信息
-        self.selected_frame_time_info.config(text=f"时间位置: {values[0]} | 帧号: {frame}")
+        self.selected_frame_time_info.config(text=f"时间位置: {frame_to_time(frame, self.video_fps)} | 帧号: {frame}")
 
         # 保存当前选择
         self.current_selected_frame_index = frame
@@ -406,42 +407,31 @@ class FirstFrameTab:
 
     def display_selected_frame(self, frame_num):
         """显示选定的帧"""
-        cap = cv2.VideoCapture(self.video_path)
-        if not cap.isOpened():
+        image = self.get_preview().get(frame_num, self.selected_preview_size())
+        if image is None:
             return
 
-        # 获取帧
-        cap.set(cv2.CAP_PROP_POS_FRAMES, frame_num)
-        ret, img = cap.read()
-        cap.release()
+        img_tk = ImageTk.PhotoImage(image)
+        self.selected_frame_preview_label.config(image=img_tk)
+        self.selected_frame_preview_label.image = img_tk
 
-        if ret:
-            # 转换为RGB
-            img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+    def selected_preview_size(self):
+        return container_size(self.selected_frame_preview_frame, (300, 250))
 
-            # 调整大小
-            h, w = img.shape[:2]
-            container_width = max(1, self.selected_frame_preview_frame.winfo_width())
-            container_height = max(1, self.selected_frame_preview_frame.winfo_height())
-
-            # 确保容器有有效尺寸
-            if container_width < 10 or container_height < 10:
-                container_width = 300
-                container_height = 250
-
-            scale = min(container_width / w, container_height / h)
-            new_w = int(w * scale)
-            new_h = int(h * scale)
+    def get_preview(self):
+        """返回当前视频的预览服务，切换视频后重新创建"""
+        if self.preview is None or self.preview.video_path != self.video_path:
+            if self.preview is not None:
+                self.preview.close()
+            self.preview = FramePreviewService(self.video_path)
+        return self.preview
 
-            img = cv2.resize(img, (new_w, new_h))
-
-            # 转换为Tkinter图像
-            img = Image.fromarray(img)
-            img_tk = ImageTk.PhotoImage(img)
-
-            # 更新标签
-            self.selected_frame_preview_label.config(image=img_tk)
-            self.selected_frame_preview_label.image = img_tk
+    def prefetch_neighbours(self):
+        """在后台预取相邻结果行的帧预览"""
+        size = self.selected_preview_size()
+        requests = [(int(record["frame"]), size)
+                    for record in self.first_frame_tree.neighbours(PREVIEW_DEFAULTS["prefetch_rows"])]
+        self.get_preview().prefetch(requests)
 
     def export_selected_frame(self):
         """导出选定的帧"""
@@ -465,13 +455,19 @@ class FirstFrameTab:
         cap.release()
 
         if ret:
-            cv2.imwrite(file_path, frame)
+            image_format = "png" if file_path.lower().endswith(".png") else "jpg"
+            cv2.imwrite(file_path, frame, imwrite_params(image_format))
             messagebox.showinfo("成功", f"帧已保存至:\n{file_path}")
         else:
             messagebox.showerror("错误", "无法获取选定帧")
 
     def generate_video_segment(self):
-        """生成从第一帧到选定帧的视频片段"""
+        """在后台生成从第一帧到选定帧的视频片段，生成过程中再次点击则取消"""
+        if self.export_job is not None and self.export_job.running:
+            self.export_job.cancel()
+            self.first_frame_status_var.set("正在取消...")
+            return
+
         if self.current_selected_frame_index < 0:
             messagebox.showinfo("提示", "请先选择一个结果")
             return
@@ -485,57 +481,134 @@ class FirstFrameTab:
         if not file_path:
             return
 
-        try:
-            # 创建输出目录（如果不存在）
-            output_dir = file_path.rsplit('/', 1)[0] if '/' in file_path else '.'
-            if not output_dir:
-                output_dir = '.'
-                
-            import os
-            if not os.path.exists(output_dir) and output_dir != '.':
-                os.makedirs(output_dir)
-
-            # 获取视频信息
-            cap = cv2.VideoCapture(self.video_path)
-            if not cap.isOpened():
-                raise Exception("无法打开源视频")
-
-            width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-            height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-            fps = self.video_fps
-
-            # 创建视频写入对象
-            if file_path.lower().endswith('.mp4'):
-                fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-            else:  # .avi
-                fourcc = cv2.VideoWriter_fourcc(*'XVID')
-
-            out = cv2.VideoWriter(file_path, fourcc, fps, (width, height))
-
-            if not out.isOpened():
-                raise Exception("无法创建输出视频文件")
-
-            # 写入从第一帧到选定帧
-            total_frames = self.current_selected_frame_index + 1
-            for i in range(total_frames):
-                cap.set(cv2.CAP_PROP_POS_FRAMES, i)
-                ret, frame = cap.read()
-                if ret:
-                    out.write(frame)
-
-                # 更新进度
-                progress = (i / total_frames) * 100
-                self.first_frame_progress_var.set(progress)
-                self.first_frame_status_var.set(f"生成片段: {i + 1}/{total_frames}...")
-                self.parent.update()
-
-            # 释放资源
-            cap.release()
-            out.release()
-
-            # 完成
-            self.first_frame_status_var.set(f"视频片段已保存至: {file_path}")
+        # 从第一帧顺序读取到选定帧，进度和结果回到界面线程处理
+        self.export_job = SegmentExportJob(
+            self.video_path, file_path, 0, self.current_selected_frame_index, self.video_fps,
+            progress_callback=lambda written, total: self.channel.call(self.update_export_progress, written, total),
+            done_callback=lambda status, error: self.channel.call(self.finish_export, file_path, status, error),
+            stream_copy=self.first_frame_stream_copy_var.get())
+        self.generate_video_btn.config(text="取消生成")
+        self.export_all_btn.config(state=tk.DISABLED)
+        self.first_frame_status_var.set("开始生成视频片段...")
+        self.export_job.start()
+
+    def update_export_progress(self, written, total):
+        """更新片段导出进度"""
+        self.first_frame_progress_var.set((written / max(1, total)) * 100)
+        self.first_frame_status_var.set(f"生成片段: {written}/{total}...")
+
+    def finish_export(self, file_path, status, error):
+        """片段导出结束"""
+        copied = self.export_job is not None and self.export_job.copied
+        self.export_job = None
+        self.generate_video_btn.config(text="生成视频片段")
+        self.export_all_btn.config(state=tk.NORMAL)
+
+        if status == "done":
+            method = "无损剪切" if copied else "重新编码"
+            self.first_frame_status_var.set(f"视频片段已保存至: {file_path} ({method})")
             messagebox.showinfo("成功", f"视频片段已成功生成!\n{file_path}")
+        elif status == "partial":
+            self.first_frame_status_var.set(f"视频片段已保存至: {file_path} ({error})")
+            messagebox.showwarning("部分完成", f"视频片段已生成，但{error}\n{file_path}")
+        elif status == "cancelled":
+            self.first_frame_status_var.set("已取消生成视频片段")
+        else:
+            messagebox.showerror("生成错误", f"生成视频片段时出错:\n{error}")
 
-        except Exception as e:
-            messagebox.showerror("生成错误", f"生成视频片段时出错:\n{str(e)}")
\ No newline at end of file
+    def export_all_segments(self):
+        """一次顺序解码导出当前列表中每个结果对应的片段 (第一帧到该帧)，导出过程中再次点击则取消"""
+        if self.export_job is not None and self.export_job.running:
+            self.export_job.cancel()
+            self.first_frame_status_var.set("正在取消...")
+            return
+
+        if not len(self.first_frame_tree):
+            messagebox.showinfo("提示", "没有可导出的结果")
+            return
+
+        output_dir = filedialog.askdirectory()
+        if not output_dir:
+            return
+
+        segments = []
+        for frame in self.first_frame_tree.records()["frame"].tolist():
+            segments.append((0, frame, os.path.join(output_dir, f"segment_0-{frame}.mp4")))
+
+        self.export_job = BatchSegmentExportJob(
+            self.video_path, segments, self.video_fps,
+            max_gap_frames=SEGMENT_EXPORT_DEFAULTS["max_gap_frames"],
+            progress_callback=lambda processed, total: self.channel.call(self.update_export_progress, processed, total),
+            done_callback=lambda status, error: self.channel.call(self.finish_batch_export, output_dir, status, error))
+        self.export_all_btn.config(text="取消导出")
+        self.generate_video_btn.config(state=tk.DISABLED)
+        self.first_frame_status_var.set(f"开始导出 {len(segments)} 个视频片段...")
+        self.export_job.start()
+
+    def finish_batch_export(self, output_dir, status, error):
+        """批量导出结束"""
+        completed = len(self.export_job.completed) if self.export_job is not None else 0
+        self.export_job = None
+        self.export_all_btn.config(text="导出全部片段")
+        if self.current_selected_frame_index >= 0:
+            self.generate_video_btn.config(state=tk.NORMAL)
+
+        if status == "done":
+            self.first_frame_status_var.set(f"已导出 {completed} 个视频片段至: {output_dir}")
+            messagebox.showinfo("成功", f"已导出 {completed} 个视频片段!\n{output_dir}")
+        elif status == "partial":
+            self.first_frame_status_var.set(f"已导出 {completed} 个视频片段至: {output_dir} ({error})")
+            messagebox.showwarning("部分完成", f"已导出 {completed} 个视频片段，{error}\n{output_dir}")
+        elif status == "cancelled":
+            self.first_frame_status_var.set(f"已取消导出，完成 {completed} 个视频片段")
+        else:
+            messagebox.showerror("导出错误", f"批量导出视频片段时出错:\n{error}")
+
+    def export_all_frames(self):
+        """把当前列表中的所有帧导出为图片，导出过程中再次点击则取消"""
+        if self.frame_export_job is not None and self.frame_export_job.running:
+            self.frame_export_job.cancel()
+            self.first_frame_status_var.set("正在取消...")
+            return
+
+        if not len(self.first_frame_tree):
+            messagebox.showinfo("提示", "没有可导出的结果")
+            return
+
+        frames = self.first_frame_tree.records()["frame"].tolist()
+        settings = FrameExportDialog(self.parent, len(set(frames))).show()
+        if not settings:
+            return
+
+        output_dir = settings["output_dir"]
+        self.frame_export_job = FrameExportJob(
+            self.video_path, frames, **settings,
+            max_gap_frames=SEGMENT_EXPORT_DEFAULTS["max_gap_frames"],
+            progress_callback=lambda completed, total: self.channel.call(self.update_frame_export_progress,
+                                                                         completed, total),
+            done_callback=lambda status, error: self.channel.call(self.finish_frame_export, output_dir, status, error))
+        self.export_frames_btn.config(text="取消导出帧")
+        self.first_frame_status_var.set(f"开始导出 {self.frame_export_job.total} 帧...")
+        self.frame_export_job.start()
+
+    def update_frame_export_progress(self, completed, total):
+        """更新帧导出进度"""
+        self.first_frame_progress_var.set((completed / max(1, total)) * 100)
+        self.first_frame_status_var.set(f"导出帧: {completed}/{total}...")
+
+    def finish_frame_export(self, output_dir, status, error):
+        """帧导出结束"""
+        completed = self.frame_export_job.completed if self.frame_export_job is not None else 0
+        self.frame_export_job = None
+        self.export_frames_btn.config(text="批量导出帧")
+
+        if status == "done":
+            self.first_frame_status_var.set(f"已导出 {completed} 帧至: {output_dir}")
+            messagebox.showinfo("成功", f"已导出 {completed} 帧!\n{output_dir}")
+        elif status == "partial":
+            self.first_frame_status_var.set(f"已导出 {completed} 帧至: {output_dir} ({error})")
+            messagebox.showwarning("部分完成", f"已导出 {completed} 帧，{error}\n{output_dir}")
+        elif status == "cancelled":
+            self.first_frame_status_var.set(f"已取消导出，完成 {completed} 帧")
+        else:
+            messagebox.showerror("导出错误", f"批量导出帧时出错:\n{error}")
@@ -1,21 +1,28 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 import cv2
-from PIL import Image, ImageTk
+import numpy as np
+from PIL import ImageTk
 import threading
-
-# 尝试导入skimage.metrics.structural_similarity
-try:
-    from skimage.metrics import structural_similarity as ssim
-except ImportError:
-    # 如果新版本不存在，尝试从旧版本导入
-    try:
-        from skimage.measure import compare_ssim as ssim
-    except ImportError:
-        ssim = None
-
-from utils.helpers import frame_to_time, sort_treeview
-from config.constants import LOOPING_VIDEO_DEFAULTS
+import os
+
+from utils.helpers import frame_to_time
+from utils.fingerprint_source import iter_fingerprints
+from utils.score_index import ScoreIndex
+from utils.ssim import frame_stats
+from utils.cascade import build_loop_cascade, luma_histogram
+from utils.frame_ring import FrameRingBuffer
+from utils.ann_index import RandomProjectionLSH, embed_gray
+from utils.loop_refine import refine_loop
+from utils.segment_export import BatchSegmentExportJob, SegmentExportJob
+from utils.stream_copy import stream_copy_available
+from utils.self_similarity import best_loop_ends, frame_descriptor, select_loops, verify_loops
+from utils.preview import FramePreviewService, container_size
+from utils.result_table import LOOP_DTYPE, make_table
+from ui.virtual_tree import VirtualTreeview
+from utils.ui_channel import UIChannel
+from config.constants import (LOOPING_VIDEO_DEFAULTS, LOOPING_ENGINES, PIPELINE_DEFAULTS,
+                              SEGMENT_EXPORT_DEFAULTS, PREVIEW_DEFAULTS)
 
 
 class LoopingVideoTab:
@@ -28,8 +35,16 @@ class LoopingVideoTab:
         self.video_fps = 30
         self.cap = None
         self.processing = False
-        self.looping_pairs = []
+        # 工作线程通过消息通道更新界面
+        self.channel = UIChannel(self.parent)
+        self.preview = None
+        self.export_job = None
+        self.looping_pairs = make_table(LOOP_DTYPE)
         self.current_looping_pair = None
+        self.detected_pairs = make_table(LOOP_DTYPE)
+        self.detected_index = None
+        self.analysis_ssim_threshold = LOOPING_VIDEO_DEFAULTS["ssim_threshold"]
+        self.analysis_summary = ""
 
     def init_ui(self):
         """初始化无缝循环视频检测标签页"""
@@ -72,6 +87,30 @@ class LoopingVideoTab:
                                            textvariable=self.search_range_var, width=10)
         search_range_spinbox.pack(fill=tk.X, pady=2)
 
+        # 检测方式
+        ttk.Label(control_frame, text="检测方式:").pack(anchor=tk.W, pady=2)
+        default_engine = next(name for name, engine in LOOPING_ENGINES.items()
+                              if engine == LOOPING_VIDEO_DEFAULTS["engine"])
+        self.looping_engine_var = tk.StringVar(value=default_engine)
+        engine_combo = ttk.Combobox(control_frame, textvariable=self.looping_engine_var,
+                                    values=list(LOOPING_ENGINES.keys()), state="readonly", width=10)
+        engine_combo.pack(fill=tk.X, pady=2)
+
+        # 级联预筛选 (更快，但可能漏掉部分循环)
+        self.looping_cascade_var = tk.BooleanVar(value=LOOPING_VIDEO_DEFAULTS["cascade"]["enabled"])
+        ttk.Checkbutton(control_frame, text="哈希预筛选 (更快，可能漏检)",
+                        variable=self.looping_cascade_var).pack(anchor=tk.W, pady=2)
+
+        # 逐帧精修
+        self.looping_refine_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(control_frame, text="逐帧精修循环点",
+                        variable=self.looping_refine_var).pack(anchor=tk.W, pady=2)
+
+        # 多进程分段解码
+        self.looping_multiprocess_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(control_frame, text="多进程分段解码",
+                        variable=self.looping_multiprocess_var).pack(anchor=tk.W, pady=2)
+
         # 操作按钮
         ttk.Label(control_frame, text="操作:", style="Header.TLabel").pack(anchor=tk.W, pady=(15, 5))
         self.looping_process_btn = ttk.Button(control_frame, text="检测循环片段",
@@ -96,37 +135,23 @@ class LoopingVideoTab:
         result_frame = ttk.LabelFrame(self.parent, text="检测结果", padding=10)
         result_frame.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=5)
 
-        # 结果列表
+        # 结果列表 (只为可见行创建条目)
         columns = ("start_time", "start_frame", "end_time", "end_frame", "ssim_value")
-        self.looping_tree = ttk.Treeview(result_frame, columns=columns, show="headings", selectmode="browse")
+        self.looping_tree = VirtualTreeview(result_frame, columns, on_select=self.on_tree_select)
 
         # 定义列
-        self.looping_tree.heading("start_time", text="开始时间",
-                                  command=lambda: sort_treeview(self.looping_tree, "start_time", False))
-        self.looping_tree.heading("start_frame", text="开始帧",
-                                  command=lambda: sort_treeview(self.looping_tree, "start_frame", False))
-        self.looping_tree.heading("end_time", text="结束时间",
-                                  command=lambda: sort_treeview(self.looping_tree, "end_time", False))
-        self.looping_tree.heading("end_frame", text="结束帧",
-                                  command=lambda: sort_treeview(self.looping_tree, "end_frame", False))
-        self.looping_tree.heading("ssim_value", text="SSIM值",
-                                  command=lambda: sort_treeview(self.looping_tree, "ssim_value", True))
-
-        # 设置列宽
-        self.looping_tree.column("start_time", width=120, anchor=tk.CENTER)
-        self.looping_tree.column("start_frame", width=80, anchor=tk.CENTER)
-        self.looping_tree.column("end_time", width=120, anchor=tk.CENTER)
-        self.looping_tree.column("end_frame", width=80, anchor=tk.CENTER)
-        self.looping_tree.column("ssim_value", width=80, anchor=tk.CENTER)
-
-        # 添加滚动条
-        scrollbar = ttk.Scrollbar(result_frame, orient=tk.VERTICAL, command=self.looping_tree.yview)
-        self.looping_tree.configure(yscrollcommand=scrollbar.set)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.looping_tree.column("start_time", "开始时间", 120, field="start_frame",
+                                 formatter=lambda record: frame_to_time(record["start_frame"], self.video_fps))
+        self.looping_tree.column("start_frame", "开始帧", 80)
+        self.looping_tree.column("end_time", "结束时间", 120, field="end_frame",
+                                 formatter=lambda record: frame_to_time(record["end_frame"], self.video_fps))
+        self.looping_tree.column("end_frame", "结束帧", 80)
+        self.looping_tree.column("ssim_value", "SSIM值", 80,
+                                 formatter=lambda record: f"{record['ssim_value']:.3f}", reverse=True)
         self.looping_tree.pack(fill=tk.BOTH, expand=True)
 
-        # 绑定选择事件
-        self.looping_tree.bind("<<TreeviewSelect>>", self.on_tree_select)
+        # 默认按SSIM值从高到低排列
+        self.looping_tree.sort("ssim_value", True)
 
         # 状态标签
         self.looping_result_count_var = tk.StringVar(value="找到 0 个循环片段")
@@ -172,10 +197,25 @@ class LoopingVideoTab:
                                                command=self.generate_looping_video, state=tk.DISABLED)
         self.generate_looping_btn.pack(fill=tk.X, pady=2)
 
+        self.export_all_looping_btn = ttk.Button(button_frame, text="导出全部循环",
+                                                 command=self.export_all_loops)
+        self.export_all_looping_btn.pack(fill=tk.X, pady=2)
+
+        # 无损剪切 (需要PyAV)
+        copy_available = stream_copy_available()
+        self.looping_stream_copy_var = tk.BooleanVar(value=SEGMENT_EXPORT_DEFAULTS["stream_copy"] and copy_available)
+        ttk.Checkbutton(button_frame, text="优先无损剪切" if copy_available else "优先无损剪切 (需要PyAV)",
+                        variable=self.looping_stream_copy_var,
+                        state=tk.NORMAL if copy_available else tk.DISABLED).pack(anchor=tk.W, pady=2)
+
     def update_ssim_threshold_label(self, *args):
         """更新SSIM阈值显示标签"""
         self.ssim_threshold_label.config(text=f"当前值: {self.ssim_threshold_var.get():.2f}")
 
+        # 已有分析结果时直接按新阈值筛选
+        if not self.processing:
+            self.apply_threshold()
+
     def browse_video(self):
         """浏览视频文件"""
         self.video_path = filedialog.askopenfilename(
@@ -203,21 +243,27 @@ class LoopingVideoTab:
         if self.processing:
             return
 
-        # 检查SSIM是否可用
-        if ssim is None:
-            messagebox.showerror("错误", "需要安装scikit-image库来计算SSIM值:\npip install scikit-image")
-            return
-
         self.processing = True
         self.looping_process_btn.config(state=tk.DISABLED, text="处理中...")
         self.looping_status_var.set("开始分析视频...")
         self.looping_progress_var.set(0)
-        self.looping_tree.delete(*self.looping_tree.get_children())
+        self.looping_tree.clear()
+
+        # 在界面线程中读取参数，工作线程不访问Tk变量
+        settings = {
+            "frame_skip": self.looping_frame_skip_var.get(),
+            "search_range": self.search_range_var.get(),
+            "ssim_threshold": self.ssim_threshold_var.get(),
+            "processes": PIPELINE_DEFAULTS["processes"] if self.looping_multiprocess_var.get() else 1,
+            "engine": LOOPING_ENGINES.get(self.looping_engine_var.get(), "window"),
+            "cascade": self.looping_cascade_var.get(),
+            "refine": self.looping_refine_var.get()
+        }
 
         # 在新线程中处理视频
-        threading.Thread(target=self.process_video, daemon=True).start()
+        threading.Thread(target=self.process_video, args=(settings,), daemon=True).start()
 
-    def process_video(self):
+    def process_video(self, settings):
         """处理无缝循环视频检测的线程函数"""
         try:
             # 获取视频帧率
@@ -232,181 +278,267 @@ class LoopingVideoTab:
             total_frames = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
             self.cap.release()
 
-            self.looping_status_var.set(f"视频帧率: {self.video_fps:.2f} FPS | 总帧数: {total_frames}")
-            self.parent.update()
+            self.channel.set(self.looping_status_var, f"视频帧率: {self.video_fps:.2f} FPS | 总帧数: {total_frames}")
 
             # 查找循环片段
-            self.looping_status_var.set("正在查找循环片段...")
-            self.parent.update()
-
-            looping_pairs = []
-            frame_skip = self.looping_frame_skip_var.get()
-            search_range = self.search_range_var.get()
-            ssim_threshold = self.ssim_threshold_var.get()
-
-            cap = cv2.VideoCapture(self.video_path)
-            
-            frame_count = 0
-            processed_frames = 0
-            
-            # 用于存储帧的缓存
-            frame_cache = {}
-            cache_limit = 50  # 限制缓存帧的数量
-            
-            while cap.isOpened():
-                ret, frame = cap.read()
-                if not ret:
-                    break
-
-                if frame_count % frame_skip == 0:
-                    # 将当前帧转换为灰度图用于SSIM比较
-                    gray_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-                    # 调整图像大小以提高处理速度并确保一致性
-                    h, w = gray_frame.shape[:2]
-                    if w > 480:  # 将宽度调整为480像素以提高处理速度
-                        scale = 480 / w
-                        new_w = 480
-                        new_h = int(h * scale)
-                        gray_frame_resized = cv2.resize(gray_frame, (new_w, new_h))
-                    else:
-                        gray_frame_resized = gray_frame
-                    
-                    # 在搜索范围内查找相似帧
-                    start_search = max(0, frame_count - search_range)
-                    best_match = None
-                    best_ssim = 0
-                    
-                    # 检查缓存中的帧
-                    keys_to_remove = []
-                    for prev_frame_num in frame_cache:
-                        if prev_frame_num < start_search:
-                            # 标记超出搜索范围的帧以便删除
-                            keys_to_remove.append(prev_frame_num)
-                            continue
-                            
-                        if prev_frame_num >= frame_count:
-                            continue
-                        
-                        # 获取之前帧
-                        prev_gray = frame_cache[prev_frame_num]
-                        
-                        # 计算SSIM值
-                        try:
-                            # 确保两个图像尺寸相同
-                            if gray_frame_resized.shape != prev_gray.shape:
-                                # 调整较小的图像以匹配较大的图像
-                                if gray_frame_resized.shape[0] * gray_frame_resized.shape[1] > prev_gray.shape[0] * prev_gray.shape[1]:
-                                    prev_gray = cv2.resize(prev_gray, (gray_frame_resized.shape[1], gray_frame_resized.shape[0]))
-                                else:
-                                    gray_frame_resized = cv2.resize(gray_frame, (prev_gray.shape[1], prev_gray.shape[0]))
-                            
-                            ssim_value = ssim(prev_gray, gray_frame_resized)
-                        except Exception as e:
-                            # 如果SSIM计算失败，跳过这一对帧
-                            continue
-                        
-                        if ssim_value >= ssim_threshold and ssim_value > best_ssim:
-                            best_ssim = ssim_value
-                            best_match = prev_frame_num
-                    
-                    # 删除超出范围的帧
-                    for key in keys_to_remove:
-                        del frame_cache[key]
-                    
-                    # 如果找到匹配
-                    if best_match is not None:
-                        # 找到一个潜在的循环片段
-                        time1 = frame_to_time(best_match, self.video_fps)
-                        time2 = frame_to_time(frame_count, self.video_fps)
-                        
-                        looping_pairs.append((
-                            best_match, time1,
-                            frame_count, time2,
-                            best_ssim
-                        ))
-                        
-                        # 清理缓存中已匹配的帧，但保留一些用于后续比较
-                        # 只保留最近的几个帧
-                        if len(frame_cache) > cache_limit:
-                            # 删除最旧的帧
-                            oldest_key = min(frame_cache.keys())
-                            del frame_cache[oldest_key]
-                    else:
-                        # 将当前帧添加到缓存中供后续比较
-                        frame_cache[frame_count] = gray_frame_resized
-                
-                frame_count += 1
-                processed_frames += 1
-
-                # 更新进度
-                if processed_frames % 10 == 0:
-                    progress = (frame_count / total_frames) * 100
-                    self.looping_progress_var.set(progress)
-                    self.looping_status_var.set(f"处理帧: {frame_count}/{total_frames}...")
-                    self.parent.update()
-
-            cap.release()
-            
-            # 保存结果
-            self.looping_pairs = looping_pairs
-            self.looping_status_var.set(f"完成! 找到 {len(looping_pairs)} 个循环片段")
-            self.looping_result_count_var.set(f"找到 {len(looping_pairs)} 个循环片段")
-
-            # 更新结果列表
-            self.parent.after(0, self.update_result_list)
+            self.channel.set(self.looping_status_var, "正在查找循环片段...")
+
+            frame_skip = settings["frame_skip"]
+            search_range = settings["search_range"]
+            ssim_threshold = settings["ssim_threshold"]
+            processes = settings["processes"]
+
+            def report_progress(frame_count):
+                progress = (frame_count / max(1, total_frames)) * 100
+                self.channel.set(self.looping_progress_var, progress)
+                self.channel.set(self.looping_status_var, f"处理帧: {frame_count}/{total_frames}...")
+
+            engine = settings["engine"]
+            if engine == "matrix":
+                looping_pairs = self.find_matrix_loops(frame_skip, total_frames, processes, report_progress)
+                # 自相似矩阵保留全部复核过的循环，任意阈值都可直接筛选
+                analysis_threshold = LOOPING_VIDEO_DEFAULTS["min_ssim_threshold"]
+            else:
+                looping_pairs = self.find_window_loops(frame_skip, search_range, ssim_threshold, total_frames,
+                                                       processes, report_progress, use_ann=engine == "ann",
+                                                       use_cascade=settings["cascade"])
+                analysis_threshold = ssim_threshold
+
+            # 在粗扫描结果附近逐帧精修循环点
+            if settings["refine"] and looping_pairs:
+                looping_pairs = self.refine_loops(looping_pairs, frame_skip, total_frames)
+
+            # 保存本次检测到的所有循环片段及其SSIM值，之后提高阈值时无需重新分析
+            self.detected_pairs = make_table(LOOP_DTYPE,
+                                             start_frame=[pair[0] for pair in looping_pairs],
+                                             end_frame=[pair[2] for pair in looping_pairs],
+                                             ssim_value=[pair[4] for pair in looping_pairs])
+            self.detected_index = ScoreIndex(self.detected_pairs["ssim_value"])
+            self.analysis_ssim_threshold = analysis_threshold
+
+            # 按当前阈值生成结果列表
+            self.channel.call(self.apply_threshold)
 
         except Exception as e:
-            self.parent.after(0, lambda: messagebox.showerror("处理错误", str(e)))
+            self.channel.call(messagebox.showerror, "处理错误", str(e))
         finally:
             self.processing = False
-            self.parent.after(0, lambda: self.looping_process_btn.config(state=tk.NORMAL, text="检测循环片段"))
+            self.channel.call(lambda: self.looping_process_btn.config(state=tk.NORMAL, text="检测循环片段"))
+
+    def find_window_loops(self, frame_skip, search_range, ssim_threshold, total_frames, processes,
+                          progress_callback, use_ann=False, use_cascade=False):
+        """在每个采样帧之前的搜索范围内查找最相似的帧，use_ann时只比较近似最近邻索引返回的候选"""
+        looping_pairs = []
+
+        # 用于存储帧的环形缓存，容量足以容纳搜索范围内的所有采样帧
+        frame_cache = FrameRingBuffer(search_range // max(1, frame_skip) + 1)
+        cache_limit = 50  # 限制缓存帧的数量
+
+        # 比较阶段: 可选的直方图、哈希预筛选，最后计算SSIM
+        if use_cascade:
+            cascade = build_loop_cascade(ssim_threshold, LOOPING_VIDEO_DEFAULTS["cascade"])
+        else:
+            cascade = build_loop_cascade(ssim_threshold, {})
+        use_histogram = "hist" in cascade.features()
+
+        # 近似最近邻索引与环形缓存保存同一批帧，按第一帧的描述子维数创建
+        ann_settings = LOOPING_VIDEO_DEFAULTS["ann"]
+        ann_index = None
+
+        # 顺序读取采样帧，转换为宽度不超过480像素的灰度图用于SSIM比较 (单进程流水线或多进程分段)
+        samples = iter_fingerprints(self.video_path, frame_skip, total_frames,
+                                    thumb_width=LOOPING_VIDEO_DEFAULTS["analysis_width"],
+                                    progress_callback=progress_callback, processes=processes)
+        for frame_count, frame_hash, gray_frame_resized in samples:
+            # 在搜索范围内查找相似帧
+            start_search = max(0, frame_count - search_range)
+            best_match = None
+            best_ssim = 0
+
+            # 计算当前帧的比较特征 (每帧只计算一次，随帧一起缓存)
+            gray_mean, gray_variance = frame_stats(gray_frame_resized)
+            features = {
+                "gray": gray_frame_resized,
+                "mean": gray_mean,
+                "variance": gray_variance,
+                "hash": np.uint64(frame_hash)
+            }
+            if use_histogram:
+                features["hist"] = luma_histogram(gray_frame_resized)
+
+            # 删除超出范围的帧
+            frame_cache.evict_before(start_search)
+
+            candidates = frame_cache.slots()
+            if use_ann:
+                descriptor = embed_gray(gray_frame_resized, ann_settings["descriptor_width"])
+                if ann_index is None:
+                    ann_index = RandomProjectionLSH(len(descriptor), ann_settings["num_tables"],
+                                                    ann_settings["num_bits"])
+                ann_index.evict_before(start_search)
+                neighbours = ann_index.query(descriptor, ann_settings["max_candidates"])
+                candidates = candidates[np.isin(frame_cache.frame_numbers[candidates], neighbours)]
+
+            # 搜索范围内的候选帧经过可选的预筛选后批量计算SSIM值
+            matches, ssim_values = cascade.run(features, candidates, frame_cache.lookup)
+            if len(matches):
+                best = int(np.argmax(ssim_values))
+                if ssim_values[best] > best_ssim:
+                    best_ssim = float(ssim_values[best])
+                    best_match = int(frame_cache.frame_numbers[matches[best]])
+
+            # 如果找到匹配
+            if best_match is not None:
+                # 找到一个潜在的循环片段
+                time1 = frame_to_time(best_match, self.video_fps)
+                time2 = frame_to_time(frame_count, self.video_fps)
+
+                looping_pairs.append((
+                    best_match, time1,
+                    frame_count, time2,
+                    best_ssim
+                ))
+
+                # 清理缓存中已匹配的帧，但保留一些用于后续比较
+                # 只保留最近的几个帧
+                if len(frame_cache) > cache_limit:
+                    # 删除最旧的帧
+                    frame_cache.discard_oldest()
+                    if ann_index is not None:
+                        ann_index.discard_oldest()
+            else:
+                # 将当前帧添加到缓存中供后续比较
+                frame_cache.push(frame_count, features)
+                if ann_index is not None:
+                    ann_index.add(frame_count, descriptor)
+
+        self.analysis_summary = cascade.summary()
+        return looping_pairs
+
+    def find_matrix_loops(self, frame_skip, total_frames, processes, progress_callback):
+        """计算整段视频的自相似矩阵，选出相关系数最高的若干循环并用SSIM复核"""
+        settings = LOOPING_VIDEO_DEFAULTS["self_similarity"]
+
+        # 顺序读取采样帧，每帧只保留紧凑的亮度描述子
+        frame_numbers = []
+        descriptors = []
+        samples = iter_fingerprints(self.video_path, frame_skip, total_frames,
+                                    thumb_width=settings["descriptor_width"],
+                                    progress_callback=progress_callback, processes=processes)
+        for frame_count, _, thumbnail in samples:
+            frame_numbers.append(frame_count)
+            descriptors.append(frame_descriptor(thumbnail))
+
+        if not descriptors:
+            self.analysis_summary = ""
+            return []
+
+        def report_rows(done, total):
+            self.channel.set(self.looping_progress_var, (done / max(1, total)) * 100)
+            self.channel.set(self.looping_status_var, f"计算自相似矩阵: {done}/{total}...")
+
+        # 分块计算自相似矩阵，间隔换算为采样帧数
+        min_gap = -(-settings["min_loop_frames"] // frame_skip)
+        best_scores, best_ends = best_loop_ends(np.stack(descriptors), min_gap,
+                                                tile_size=settings["tile_size"], progress_callback=report_rows)
+        radius = max(1, settings["suppression_frames"] // frame_skip)
+        loops = select_loops(best_scores, best_ends, settings["top_k"], radius)
+
+        # 用精确SSIM复核候选循环
+        self.channel.set(self.looping_status_var, f"正在复核 {len(loops)} 个候选循环...")
+        frame_pairs = [(frame_numbers[start], frame_numbers[end]) for start, end in loops]
+        ssim_values = verify_loops(self.video_path, frame_pairs, LOOPING_VIDEO_DEFAULTS["analysis_width"])
+
+        looping_pairs = []
+        for (frame1, frame2), ssim_value in zip(frame_pairs, ssim_values):
+            if ssim_value is None:
+                continue
+            looping_pairs.append((
+                frame1, frame_to_time(frame1, self.video_fps),
+                frame2, frame_to_time(frame2, self.video_fps),
+                ssim_value
+            ))
 
-    def update_result_list(self):
-        """更新结果列表"""
-        # 清空现有内容
-        for item in self.looping_tree.get_children():
-            self.looping_tree.delete(item)
+        self.analysis_summary = f"自相似矩阵: {len(frame_numbers)} 个采样帧，复核 {len(loops)} 个候选循环"
+        return looping_pairs
 
-        # 添加新结果，按SSIM值排序
-        sorted_pairs = sorted(self.looping_pairs, key=lambda x: x[4], reverse=True)
-        
-        for pair in sorted_pairs:
-            frame1, time1, frame2, time2, ssim_value = pair
-            self.looping_tree.insert("", tk.END, values=(
-                time1,
-                frame1,
-                time2,
-                frame2,
-                f"{ssim_value:.3f}"
-            ))
-            
-    def on_tree_select(self, event):
-        """当选中结果时"""
-        selected = self.looping_tree.selection()
-        if not selected:
-            return
+    def refine_loops(self, looping_pairs, frame_skip, total_frames):
+        """在每个循环的起止帧附近 (±采样间隔) 逐帧搜索SSIM最高的循环点"""
+        settings = LOOPING_VIDEO_DEFAULTS["refine"]
+        refined_pairs = []
+        seen = set()
+
+        cap = cv2.VideoCapture(self.video_path)
+        try:
+            for idx, pair in enumerate(looping_pairs):
+                frame1, _, frame2, _, ssim_value = pair
+                result = refine_loop(cap, frame1, frame2, frame_skip, LOOPING_VIDEO_DEFAULTS["analysis_width"],
+                                     search_width=settings["search_width"], total_frames=total_frames,
+                                     verify_count=settings["verify_count"])
+                # 精修结果不如原结果时保留原结果
+                if result is not None and result[2] >= ssim_value:
+                    frame1, frame2, ssim_value = result
+                    pair = (frame1, frame_to_time(frame1, self.video_fps),
+                            frame2, frame_to_time(frame2, self.video_fps), ssim_value)
+
+                # 多个粗结果可能精修到同一个循环
+                if (frame1, frame2) not in seen:
+                    seen.add((frame1, frame2))
+                    refined_pairs.append(pair)
+
+                self.channel.set(self.looping_progress_var, ((idx + 1) / len(looping_pairs)) * 100)
+                self.channel.set(self.looping_status_var, f"精修循环点: {idx + 1}/{len(looping_pairs)}...")
+        finally:
+            cap.release()
 
-        item = self.looping_tree.item(selected[0])
-        values = item['values']
+        return refined_pairs
 
-        if not values or len(values) < 4:
+    def apply_threshold(self):
+        """在本次检测到的循环片段中二分查找SSIM不低于当前阈值的结果"""
+        if self.detected_index is None:
             return
 
-        # 获取帧号
-        try:
-            frame1 = int(values[1])
-            frame2 = int(values[3])
-        except (ValueError, IndexError):
+        ssim_threshold = self.ssim_threshold_var.get()
+        if ssim_threshold < self.analysis_ssim_threshold:
+            # 更低阈值下的匹配在本次分析中未被记录
+            self.looping_status_var.set(
+                f"阈值低于本次检测阈值 {self.analysis_ssim_threshold:.2f}，请重新检测循环片段")
+            ssim_threshold = self.analysis_ssim_threshold
+
+        selected = self.detected_index.select_at_least(ssim_threshold)
+        looping_pairs = self.detected_pairs[selected]
+
+        # 保存结果
+        self.looping_pairs = looping_pairs
+        if ssim_threshold == self.ssim_threshold_var.get():
+            self.looping_status_var.set(f"完成! 找到 {len(looping_pairs)} 个循环片段\n{self.analysis_summary}")
+        self.looping_result_count_var.set(f"找到 {len(looping_pairs)} 个循环片段")
+
+        # 更新结果列表
+        self.update_result_list()
+
+    def update_result_list(self):
+        """更新结果列表"""
+        self.looping_tree.set_data(self.looping_pairs)
+
+    def on_tree_select(self):
+        """当选中结果时"""
+        record = self.looping_tree.selected_record()
+        if record is None:
             return
 
+        frame1 = int(record["start_frame"])
+        frame2 = int(record["end_frame"])
+
         # 显示图像
         self.display_frames(frame1, frame2,
                             self.looping_image_label1, self.looping_image_frame1,
                             self.looping_image_label2, self.looping_image_frame2)
+        self.prefetch_neighbours()
 
         # 更新时间信息
-        self.looping_time_info1.config(text=f"开始时间: {values[0]} | 帧号: {frame1}")
-        self.looping_time_info2.config(text=f"结束时间: {values[2]} | 帧号: {frame2}")
+        self.looping_time_info1.config(text=f"开始时间: {frame_to_time(frame1, self.video_fps)} | 帧号: {frame1}")
+        self.looping_time_info2.config(text=f"结束时间: {frame_to_time(frame2, self.video_fps)} | 帧号: {frame2}")
 
         # 保存当前选择
         self.current_looping_pair = (frame1, frame2)
@@ -414,61 +546,50 @@ class LoopingVideoTab:
 
     def display_frames(self, frame1, frame2, label1, frame1_container, label2, frame2_container):
         """显示两个帧的图像"""
-        cap = cv2.VideoCapture(self.video_path)
-        if not cap.isOpened():
+        self.show_preview(frame1, label1, frame1_container)
+        self.show_preview(frame2, label2, frame2_container)
+
+    def get_preview(self):
+        """返回当前视频的预览服务，切换视频后重新创建"""
+        if self.preview is None or self.preview.video_path != self.video_path:
+            if self.preview is not None:
+                self.preview.close()
+            self.preview = FramePreviewService(self.video_path)
+        return self.preview
+
+    def show_preview(self, frame_num, label, container, default_size=(300, 200)):
+        """在标签中显示帧预览 (经预览服务缓存)"""
+        image = self.get_preview().get(frame_num, container_size(container, default_size))
+        if image is None:
             return
 
-        # 获取第一帧
-        cap.set(cv2.CAP_PROP_POS_FRAMES, frame1)
-        ret, img1 = cap.read()
-        if ret:
-            self.display_image(img1, label1, frame1_container)
-
-        # 获取第二帧
-        cap.set(cv2.CAP_PROP_POS_FRAMES, frame2)
-        ret, img2 = cap.read()
-        if ret:
-            self.display_image(img2, label2, frame2_container)
-
-        cap.release()
-
-    def display_image(self, cv_img, label, container):
-        """在标签中显示OpenCV图像"""
-        # 转换为RGB
-        cv_img = cv2.cvtColor(cv_img, cv2.COLOR_BGR2RGB)
-
-        # 调整大小以适应容器
-        h, w = cv_img.shape[:2]
-        container_width = max(1, container.winfo_width())
-        container_height = max(1, container.winfo_height())
-
-        # 确保容器有有效尺寸
-        if container_width < 10 or container_height < 10:
-            container_width = 300
-            container_height = 200
-
-        scale = min(container_width / w, container_height / h)
-        new_w = int(w * scale)
-        new_h = int(h * scale)
-
-        cv_img = cv2.resize(cv_img, (new_w, new_h))
-
-        # 转换为Tkinter图像
-        img = Image.fromarray(cv_img)
-        img_tk = ImageTk.PhotoImage(img)
-
-        # 更新标签
+        img_tk = ImageTk.PhotoImage(image)
         label.config(image=img_tk)
         label.image = img_tk  # 保持引用
 
+    def prefetch_neighbours(self):
+        """在后台预取相邻结果行的两帧预览"""
+        size1 = container_size(self.looping_image_frame1, (300, 200))
+        size2 = container_size(self.looping_image_frame2, (300, 200))
+        requests = []
+        for record in self.looping_tree.neighbours(PREVIEW_DEFAULTS["prefetch_rows"]):
+            requests.append((int(record["start_frame"]), size1))
+            requests.append((int(record["end_frame"]), size2))
+        self.get_preview().prefetch(requests)
+
     def generate_looping_video(self):
-        """生成循环视频"""
+        """在后台生成循环视频，生成过程中再次点击则取消"""
+        if self.export_job is not None and self.export_job.running:
+            self.export_job.cancel()
+            self.looping_status_var.set("正在取消...")
+            return
+
         if not self.current_looping_pair:
             messagebox.showinfo("提示", "请先选择一个循环片段")
             return
 
         start_frame, end_frame = self.current_looping_pair
-        
+
         # 选择保存位置
         file_path = filedialog.asksaveasfilename(
             defaultextension=".mp4",
@@ -478,48 +599,88 @@ class LoopingVideoTab:
         if not file_path:
             return
 
-        try:
-            # 获取视频信息
-            cap = cv2.VideoCapture(self.video_path)
-            if not cap.isOpened():
-                raise Exception("无法打开源视频")
-
-            width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-            height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-            fps = self.video_fps
-
-            # 创建视频写入对象
-            if file_path.lower().endswith('.mp4'):
-                fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-            else:  # .avi
-                fourcc = cv2.VideoWriter_fourcc(*'XVID')
-
-            out = cv2.VideoWriter(file_path, fourcc, fps, (width, height))
-
-            if not out.isOpened():
-                raise Exception("无法创建输出视频文件")
-
-            # 写入循环片段
-            total_frames = end_frame - start_frame + 1
-            for i in range(start_frame, end_frame + 1):
-                cap.set(cv2.CAP_PROP_POS_FRAMES, i)
-                ret, frame = cap.read()
-                if ret:
-                    out.write(frame)
-
-                # 更新进度
-                progress = ((i - start_frame + 1) / total_frames) * 100
-                self.looping_progress_var.set(progress)
-                self.looping_status_var.set(f"生成视频: {i - start_frame + 1}/{total_frames}...")
-                self.parent.update()
-
-            # 释放资源
-            cap.release()
-            out.release()
-
-            # 完成
-            self.looping_status_var.set(f"循环视频已保存至: {file_path}")
+        # 从开始帧顺序读取到结束帧，进度和结果回到界面线程处理
+        self.export_job = SegmentExportJob(
+            self.video_path, file_path, start_frame, end_frame, self.video_fps,
+            progress_callback=lambda written, total: self.channel.call(self.update_export_progress, written, total),
+            done_callback=lambda status, error: self.channel.call(self.finish_export, file_path, status, error),
+            stream_copy=self.looping_stream_copy_var.get())
+        self.generate_looping_btn.config(text="取消生成")
+        self.export_all_looping_btn.config(state=tk.DISABLED)
+        self.looping_status_var.set("开始生成循环视频...")
+        self.export_job.start()
+
+    def update_export_progress(self, written, total):
+        """更新循环视频导出进度"""
+        self.looping_progress_var.set((written / max(1, total)) * 100)
+        self.looping_status_var.set(f"生成视频: {written}/{total}...")
+
+    def finish_export(self, file_path, status, error):
+        """循环视频导出结束"""
+        copied = self.export_job is not None and self.export_job.copied
+        self.export_job = None
+        self.generate_looping_btn.config(text="生成循环视频")
+        self.export_all_looping_btn.config(state=tk.NORMAL)
+
+        if status == "done":
+            method = "无损剪切" if copied else "重新编码"
+            self.looping_status_var.set(f"循环视频已保存至: {file_path} ({method})")
             messagebox.showinfo("成功", f"循环视频已成功生成!\n{file_path}")
+        elif status == "partial":
+            self.looping_status_var.set(f"循环视频已保存至: {file_path} ({error})")
+            messagebox.showwarning("部分完成", f"循环视频已生成，但{error}\n{file_path}")
+        elif status == "cancelled":
+            self.looping_status_var.set("已取消生成循环视频")
+        else:
+            messagebox.showerror("生成错误", f"生成循环视频时出错:\n{error}")
+
+    def export_all_loops(self):
+        """一次顺序解码导出当前列表中的全部循环片段，导出过程中再次点击则取消"""
+        if self.export_job is not None and self.export_job.running:
+            self.export_job.cancel()
+            self.looping_status_var.set("正在取消...")
+            return
 
-        except Exception as e:
-            messagebox.showerror("生成错误", f"生成循环视频时出错:\n{str(e)}")
\ No newline at end of file
+        if not len(self.looping_tree):
+            messagebox.showinfo("提示", "没有可导出的循环片段")
+            return
+
+        output_dir = filedialog.askdirectory()
+        if not output_dir:
+            return
+
+        segments = []
+        records = self.looping_tree.records()
+        for idx, (start_frame, end_frame) in enumerate(zip(records["start_frame"].tolist(),
+                                                           records["end_frame"].tolist())):
+            file_name = f"loop_{idx + 1:03d}_{start_frame}-{end_frame}.mp4"
+            segments.append((start_frame, end_frame, os.path.join(output_dir, file_name)))
+
+        self.export_job = BatchSegmentExportJob(
+            self.video_path, segments, self.video_fps,
+            max_gap_frames=SEGMENT_EXPORT_DEFAULTS["max_gap_frames"],
+            progress_callback=lambda processed, total: self.channel.call(self.update_export_progress, processed, total),
+            done_callback=lambda status, error: self.channel.call(self.finish_batch_export, output_dir, status, error))
+        self.export_all_looping_btn.config(text="取消导出")
+        self.generate_looping_btn.config(state=tk.DISABLED)
+        self.looping_status_var.set(f"开始导出 {len(segments)} 个循环片段...")
+        self.export_job.start()
+
+    def finish_batch_export(self, output_dir, status, error):
+        """批量导出结束"""
+        completed = len(self.export_job.completed) if self.export_job is not None else 0
+        self.export_job = None
+        self.export_all_looping_btn.config(text="导出全部循环")
+        if self.current_looping_pair:
+            self.generate_looping_btn.config(state=tk.NORMAL)
+
+        if status == "done":
+            self.looping_status_var.set(f"已导出 {completed} 个循环片段至: {output_dir}")
+            messagebox.showinfo("成功", f"已导出 {completed} 个循环片段!\n{output_dir}")
+        elif status == "partial":
+            self.looping_status_var.set(f"已导出 {completed} 个循环片段至: {output_dir} ({error})")
+            messagebox.showwarning("部分完成", f"已导出 {completed} 个循环片段，{error}\n{output_dir}")
+        elif status == "cancelled":
+            self.looping_status_var.set(f"已取消导出，完成 {completed} 个循环片段")
+        else:
+            messagebox.showerror("导出错误", f"批量导出循环片段时出错:\n{error}")
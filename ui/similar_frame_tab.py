@@ -1,11 +1,24 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 import cv2
-from PIL import Image, ImageTk
+from PIL import ImageTk
 import threading
 
-from utils.helpers import frame_to_time, calculate_frame_hash, sort_treeview
-from config.constants import SIMILAR_FRAME_DEFAULTS
+from utils.helpers import frame_to_time
+from utils.fingerprint import collect_fingerprints, find_candidate_pairs, hash_similarity, HASH_BITS
+from utils.hamming import max_accepted_distance
+from utils.score_index import ScoreIndex
+from utils.clustering import find_similar_clusters, clusters_from_pairs
+from utils.band_search import BandedPairSearch, find_banded_pairs
+from utils.fingerprint_source import iter_fingerprints
+from utils.frame_export import FrameExportJob, imwrite_params
+from ui.export_dialog import FrameExportDialog
+from ui.virtual_tree import VirtualTreeview
+from utils.preview import FramePreviewService, container_size
+from utils.result_table import CLUSTER_DTYPE, SIMILAR_PAIR_DTYPE, ResultFilter, make_table
+from utils.ui_channel import UIChannel
+from config.constants import (SIMILAR_FRAME_DEFAULTS, SIMILAR_SEARCH_METHODS, SIMILAR_RESULT_MODES,
+                              PIPELINE_DEFAULTS, SEGMENT_EXPORT_DEFAULTS, PREVIEW_DEFAULTS)
 
 
 class SimilarFrameTab:
@@ -18,9 +31,25 @@ class SimilarFrameTab:
         self.video_fps = 30
         self.cap = None
         self.processing = False
-        self.similar_pairs = []
+        # 工作线程通过消息通道更新界面
+        self.channel = UIChannel(self.parent)
+        self.preview = None
+        self.frame_export_job = None
+        self.similar_pairs = make_table(SIMILAR_PAIR_DTYPE)
+        self.similar_filter = None
         self.current_similar_frame_index = -1
-        self.original_similar_pairs = []
+        self.candidate_frames1 = None
+        self.candidate_frames2 = None
+        self.candidate_distances = None
+        self.candidate_index = None
+        self.result_mode = SIMILAR_FRAME_DEFAULTS["result_mode"]
+        self.clusters = None
+        self.cluster_frames = None
+        # 上一次分析的指纹、查找设置和已查找的最大汉明距离
+        self.search_frames = None
+        self.search_hashes = None
+        self.search_settings = None
+        self.searched_distance = -1
 
     def init_ui(self):
         """初始化相似帧查找标签页"""
@@ -56,6 +85,36 @@ class SimilarFrameTab:
                                          textvariable=self.similar_frame_skip_var, width=10)
         frame_skip_spinbox.pack(fill=tk.X, pady=2)
 
+        # 最大时间间隔
+        ttk.Label(control_frame, text="最大时间间隔 (秒, 0为不限):").pack(anchor=tk.W, pady=2)
+        self.similar_max_gap_var = tk.IntVar(value=SIMILAR_FRAME_DEFAULTS["max_time_gap"])
+        max_gap_spinbox = ttk.Spinbox(control_frame, from_=0, to=SIMILAR_FRAME_DEFAULTS["max_time_gap_limit"],
+                                      textvariable=self.similar_max_gap_var, width=10)
+        max_gap_spinbox.pack(fill=tk.X, pady=2)
+
+        # 查找方式
+        ttk.Label(control_frame, text="查找方式:").pack(anchor=tk.W, pady=2)
+        default_method = next(name for name, method in SIMILAR_SEARCH_METHODS.items()
+                              if method == SIMILAR_FRAME_DEFAULTS["search_method"])
+        self.similar_search_method_var = tk.StringVar(value=default_method)
+        search_method_combo = ttk.Combobox(control_frame, textvariable=self.similar_search_method_var,
+                                           values=list(SIMILAR_SEARCH_METHODS.keys()), state="readonly", width=10)
+        search_method_combo.pack(fill=tk.X, pady=2)
+
+        # 结果形式
+        ttk.Label(control_frame, text="结果形式:").pack(anchor=tk.W, pady=2)
+        default_mode = next(name for name, mode in SIMILAR_RESULT_MODES.items()
+                            if mode == SIMILAR_FRAME_DEFAULTS["result_mode"])
+        self.similar_result_mode_var = tk.StringVar(value=default_mode)
+        result_mode_combo = ttk.Combobox(control_frame, textvariable=self.similar_result_mode_var,
+                                         values=list(SIMILAR_RESULT_MODES.keys()), state="readonly", width=10)
+        result_mode_combo.pack(fill=tk.X, pady=2)
+
+        # 多进程分段解码
+        self.similar_multiprocess_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(control_frame, text="多进程分段解码",
+                        variable=self.similar_multiprocess_var).pack(anchor=tk.W, pady=2)
+
         # 操作按钮
         ttk.Label(control_frame, text="操作:", style="Header.TLabel").pack(anchor=tk.W, pady=(15, 5))
         self.similar_process_btn = ttk.Button(control_frame, text="查找相似帧",
@@ -90,39 +149,16 @@ class SimilarFrameTab:
         search_entry = ttk.Entry(search_frame, textvariable=self.similar_search_var, width=25)
         search_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
         search_entry.insert(0, "输入时间或帧号...")
+        ttk.Label(result_frame, text="支持范围: 100-200、0:01:00-0:02:00、>0.9").pack(anchor=tk.W)
 
-        # 结果列表
+        # 结果列表 (只为可见行创建条目)
         columns = ("time1", "frame1", "time2", "frame2", "similarity")
-        self.similar_tree = ttk.Treeview(result_frame, columns=columns, show="headings", selectmode="browse")
+        self.similar_tree = VirtualTreeview(result_frame, columns, on_select=self.on_tree_select)
 
         # 定义列
-        self.similar_tree.heading("time1", text="时间位置 1",
-                                  command=lambda: sort_treeview(self.similar_tree, "time1", False))
-        self.similar_tree.heading("frame1", text="帧号 1",
-                                  command=lambda: sort_treeview(self.similar_tree, "frame1", False))
-        self.similar_tree.heading("time2", text="时间位置 2",
-                                  command=lambda: sort_treeview(self.similar_tree, "time2", False))
-        self.similar_tree.heading("frame2", text="帧号 2",
-                                  command=lambda: sort_treeview(self.similar_tree, "frame2", False))
-        self.similar_tree.heading("similarity", text="相似度",
-                                  command=lambda: sort_treeview(self.similar_tree, "similarity", True))
-
-        # 设置列宽
-        self.similar_tree.column("time1", width=120, anchor=tk.CENTER)
-        self.similar_tree.column("frame1", width=80, anchor=tk.CENTER)
-        self.similar_tree.column("time2", width=120, anchor=tk.CENTER)
-        self.similar_tree.column("frame2", width=80, anchor=tk.CENTER)
-        self.similar_tree.column("similarity", width=80, anchor=tk.CENTER)
-
-        # 添加滚动条
-        scrollbar = ttk.Scrollbar(result_frame, orient=tk.VERTICAL, command=self.similar_tree.yview)
-        self.similar_tree.configure(yscrollcommand=scrollbar.set)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.define_result_columns("pairs")
         self.similar_tree.pack(fill=tk.BOTH, expand=True)
 
-        # 绑定选择事件
-        self.similar_tree.bind("<<TreeviewSelect>>", self.on_tree_select)
-
         # 状态标签
         self.similar_result_count_var = tk.StringVar(value="找到 0 组相似帧")
         result_count_label = ttk.Label(result_frame, textvariable=self.similar_result_count_var)
@@ -165,6 +201,9 @@ class SimilarFrameTab:
 
         ttk.Button(button_frame, text="导出当前帧",
                    command=self.export_current_frame).pack(fill=tk.X, pady=2)
+        self.export_frames_btn = ttk.Button(button_frame, text="批量导出帧",
+                                            command=self.export_all_frames)
+        self.export_frames_btn.pack(fill=tk.X, pady=2)
         ttk.Button(button_frame, text="打开视频位置",
                    command=self.open_video_at_current_frame).pack(fill=tk.X, pady=2)
 
@@ -173,10 +212,31 @@ class SimilarFrameTab:
         # 清除默认文本（如果需要）
         self.similar_search_var.set("")
 
+    def define_result_columns(self, result_mode):
+        """按结果形式定义列: 帧对模式显示两帧和相似度，分组模式显示代表帧、组内最后一帧和帧数"""
+        if result_mode == "clusters":
+            titles = ("首帧时间", "代表帧", "末帧时间", "末帧")
+            self.similar_tree.column("similarity", "帧数", 80, field="count", reverse=True)
+        else:
+            titles = ("时间位置 1", "帧号 1", "时间位置 2", "帧号 2")
+            self.similar_tree.column("similarity", "相似度", 80,
+                                     formatter=lambda record: f"{record['similarity']:.2f}", reverse=True)
+
+        self.similar_tree.column("time1", titles[0], 120, field="frame1",
+                                 formatter=lambda record: frame_to_time(record["frame1"], self.video_fps))
+        self.similar_tree.column("frame1", titles[1], 80)
+        self.similar_tree.column("time2", titles[2], 120, field="frame2",
+                                 formatter=lambda record: frame_to_time(record["frame2"], self.video_fps))
+        self.similar_tree.column("frame2", titles[3], 80)
+
     def update_threshold_label(self, *args):
         """更新阈值显示标签"""
         self.similar_threshold_label.config(text=f"当前值: {self.similar_threshold_var.get():.2f}")
 
+        # 已有分析结果时直接按新阈值筛选
+        if not self.processing:
+            self.apply_threshold()
+
     def browse_video(self):
         """浏览视频文件"""
         self.video_path = filedialog.askopenfilename(
@@ -208,12 +268,22 @@ class SimilarFrameTab:
         self.similar_process_btn.config(state=tk.DISABLED, text="处理中...")
         self.similar_status_var.set("开始分析视频...")
         self.similar_progress_var.set(0)
-        self.similar_tree.delete(*self.similar_tree.get_children())
+        self.similar_tree.clear()
+
+        # 在界面线程中读取参数，工作线程不访问Tk变量；按开始时的阈值查找
+        settings = {
+            "threshold": self.similar_threshold_var.get(),
+            "frame_skip": self.similar_frame_skip_var.get(),
+            "max_time_gap": self.similar_max_gap_var.get(),
+            "processes": PIPELINE_DEFAULTS["processes"] if self.similar_multiprocess_var.get() else 1,
+            "method": SIMILAR_SEARCH_METHODS.get(self.similar_search_method_var.get(), "matrix"),
+            "result_mode": SIMILAR_RESULT_MODES.get(self.similar_result_mode_var.get(), "pairs")
+        }
 
         # 在新线程中处理视频
-        threading.Thread(target=self.process_frames, daemon=True).start()
+        threading.Thread(target=self.process_frames, args=(settings,), daemon=True).start()
 
-    def process_frames(self):
+    def process_frames(self, settings):
         """处理视频的线程函数"""
         try:
             # 获取视频帧率
@@ -228,222 +298,238 @@ class SimilarFrameTab:
             total_frames = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
             self.cap.release()
 
-            self.similar_status_var.set(f"视频帧率: {self.video_fps:.2f} FPS | 总帧数: {total_frames}")
-            self.parent.update()
-
-            # 提取帧
-            self.similar_status_var.set("正在提取视频帧...")
-            self.parent.update()
-
-            frames = []
-            cap = cv2.VideoCapture(self.video_path)
-            frame_count = 0
-            extracted_count = 0
-            frame_skip = self.similar_frame_skip_var.get()
-
-            while cap.isOpened():
-                ret, frame = cap.read()
-                if not ret:
-                    break
+            self.channel.set(self.similar_status_var, f"视频帧率: {self.video_fps:.2f} FPS | 总帧数: {total_frames}")
+
+            # 边解码边计算指纹，不保留解码后的帧
+            self.channel.set(self.similar_status_var, "正在提取帧指纹...")
+
+            threshold = settings["threshold"]
+            frame_skip = settings["frame_skip"]
+            max_gap_frames = int(round(settings["max_time_gap"] * self.video_fps))
+            # 限定时间间隔时边解码边查找，提取进度即总进度
+            extract_share = 100 if max_gap_frames > 0 else 30
+
+            def report_extract_progress(frame_count):
+                progress = min(extract_share, (frame_count / max(1, total_frames)) * extract_share)
+                self.channel.set(self.similar_progress_var, progress)
+                self.channel.set(self.similar_status_var, f"提取帧: {frame_count}/{total_frames}...")
+
+            samples = iter_fingerprints(self.video_path, frame_skip, total_frames,
+                                        progress_callback=report_extract_progress, processes=settings["processes"])
+            band_search = None
+            if max_gap_frames > 0:
+                band_search = BandedPairSearch(max_gap_frames, frame_skip, threshold)
+                samples = band_search.observe(samples)
+            fingerprints = collect_fingerprints(samples, expected_count=total_frames // frame_skip + 1)
+            frame_numbers, hashes = fingerprints.frame_numbers, fingerprints.hashes
+
+            self.channel.set(self.similar_status_var, f"已提取 {len(fingerprints)} 帧 (采样间隔: {frame_skip})")
+
+            # 保存指纹和本次的查找设置，阈值调高时据此重新查找而不重新解码
+            self.search_frames, self.search_hashes = frame_numbers, hashes
+            self.search_settings = {
+                "method": settings["method"],
+                "result_mode": settings["result_mode"],
+                "max_gap_frames": max_gap_frames,
+                "frame_skip": frame_skip
+            }
 
-                if frame_count % frame_skip == 0:
-                    frames.append((frame_count, frame))
-                    extracted_count += 1
+            # 查找相似帧
+            self.channel.set(self.similar_status_var, "正在查找相似帧...")
+            self.search_candidates(threshold, band_search.pairs() if band_search is not None else None,
+                                   progress_start=30)
 
-                frame_count += 1
+            # 按当前阈值生成结果列表
+            self.channel.call(self.apply_threshold)
 
-                # 更新进度
-                if frame_count % 50 == 0:
-                    progress = min(30, (frame_count / total_frames) * 30)
-                    self.similar_progress_var.set(progress)
-                    self.similar_status_var.set(f"提取帧: {frame_count}/{total_frames}...")
-                    self.parent.update()
+        except Exception as e:
+            self.channel.call(messagebox.showerror, "处理错误", str(e))
+        finally:
+            self.processing = False
+            self.channel.call(lambda: self.similar_process_btn.config(state=tk.NORMAL, text="查找相似帧"))
+
+    def search_candidates(self, threshold, band_pairs=None, progress_start=0):
+        """按threshold在保存的指纹上查找候选结果，阈值不超过threshold时只需在其中筛选"""
+        frame_numbers, hashes = self.search_frames, self.search_hashes
+        settings = self.search_settings
+        result_mode = settings["result_mode"]
+
+        def report_progress(i, total):
+            progress = progress_start + (i / total) * (100 - progress_start)
+            self.channel.set(self.similar_progress_var, progress)
+            self.channel.set(self.similar_status_var, f"查找相似帧: {i + 1}/{total}...")
+
+        if settings["max_gap_frames"] > 0:
+            # 时间窗口内的帧对在解码时已找到，重新查找时在保存的指纹上再走一遍窗口
+            if band_pairs is None:
+                band_pairs = find_banded_pairs(frame_numbers, hashes, settings["max_gap_frames"],
+                                               settings["frame_skip"], threshold)
+            rows, cols, distances = band_pairs
+            clusters = (clusters_from_pairs(len(hashes), rows, cols, distances, threshold)
+                        if result_mode == "clusters" else None)
+        elif result_mode == "clusters":
+            # 边查找边合并为分组，不保存帧对；各距离级别的分组都已记录
+            clusters = find_similar_clusters(hashes, threshold, report_progress, settings["method"])
+        else:
+            rows, cols, distances = find_candidate_pairs(hashes, threshold, report_progress, settings["method"])
+            clusters = None
 
-            cap.release()
-            self.similar_status_var.set(f"已提取 {extracted_count} 帧 (采样间隔: {frame_skip})")
-            self.parent.update()
+        if clusters is not None:
+            self.clusters = clusters
+            self.cluster_frames = frame_numbers
+            self.candidate_index = None
+        else:
+            self.candidate_frames1 = frame_numbers[rows]
+            self.candidate_frames2 = frame_numbers[cols]
+            self.candidate_distances = distances
+            self.candidate_index = ScoreIndex(distances)
+            self.clusters = None
+        self.result_mode = result_mode
+        self.searched_distance = max_accepted_distance(threshold, HASH_BITS)
+
+    def start_research(self, threshold):
+        """阈值超出已查找的范围时，在后台按新阈值重新查找"""
+        if self.processing:
+            return
 
-            # 查找相似帧
-            self.similar_status_var.set("正在查找相似帧...")
-            self.parent.update()
-
-            similar_pairs = []
-            total_frames = len(frames)
-
-            for i in range(total_frames):
-                for j in range(i + 1, total_frames):
-                    # 计算哈希
-                    frame1_hash = calculate_frame_hash(frames[i][1])
-                    frame2_hash = calculate_frame_hash(frames[j][1])
-
-                    # 计算相似度
-                    distance = frame1_hash - frame2_hash
-                    max_distance = len(frame1_hash)
-                    similarity = 1 - (distance / max_distance)
-
-                    threshold = self.similar_threshold_var.get()
-                    if similarity > (1 - threshold):
-                        # 计算时间位置
-                        time1 = frame_to_time(frames[i][0], self.video_fps)
-                        time2 = frame_to_time(frames[j][0], self.video_fps)
-
-                        similar_pairs.append((
-                            frames[i][0], time1,
-                            frames[j][0], time2,
-                            similarity
-                        ))
-
-                # 更新进度
-                if i % 5 == 0:
-                    progress = 30 + (i / total_frames) * 70
-                    self.similar_progress_var.set(progress)
-                    self.similar_status_var.set(f"查找相似帧: {i + 1}/{total_frames}...")
-                    self.parent.update()
-
-            # 保存结果
-            self.similar_pairs = similar_pairs
-            self.similar_status_var.set(f"完成! 找到 {len(similar_pairs)} 组相似帧")
-            self.similar_result_count_var.set(f"找到 {len(similar_pairs)} 组相似帧")
-
-            # 更新结果列表
-            self.parent.after(0, self.update_result_list)
+        self.processing = True
+        self.similar_process_btn.config(state=tk.DISABLED, text="处理中...")
+        self.similar_status_var.set("阈值超出已查找的范围，正在重新查找...")
+        self.similar_progress_var.set(0)
+        threading.Thread(target=self.research_frames, args=(threshold,), daemon=True).start()
 
+    def research_frames(self, threshold):
+        """重新查找的线程函数"""
+        try:
+            self.search_candidates(threshold)
+            self.channel.call(self.apply_threshold)
         except Exception as e:
-            self.parent.after(0, lambda: messagebox.showerror("处理错误", str(e)))
+            self.channel.call(messagebox.showerror, "处理错误", str(e))
         finally:
             self.processing = False
-            self.parent.after(0, lambda: self.similar_process_btn.config(state=tk.NORMAL, text="查找相似帧"))
+            self.channel.call(lambda: self.similar_process_btn.config(state=tk.NORMAL, text="查找相似帧"))
+
+    def apply_threshold(self):
+        """在保存的候选帧对中二分查找满足当前阈值的结果，超出已查找的范围时重新查找"""
+        threshold = self.similar_threshold_var.get()
+        max_distance = max_accepted_distance(threshold, HASH_BITS)
+        if self.search_hashes is not None and max_distance > self.searched_distance:
+            self.start_research(threshold)
+            return
+        if self.result_mode == "clusters":
+            self.apply_cluster_threshold(max_distance)
+            return
+        if self.candidate_index is None:
+            return
+
+        selected = self.candidate_index.select_at_most(max_distance)
+
+        similar_pairs = make_table(SIMILAR_PAIR_DTYPE,
+                                   frame1=self.candidate_frames1[selected],
+                                   frame2=self.candidate_frames2[selected],
+                                   similarity=hash_similarity(self.candidate_distances[selected]))
+
+        # 保存结果
+        self.similar_pairs = similar_pairs
+        self.similar_status_var.set(f"完成! 找到 {len(similar_pairs)} 组相似帧")
+        self.similar_result_count_var.set(f"找到 {len(similar_pairs)} 组相似帧")
+
+        # 更新结果列表
+        self.update_result_list()
+
+    def apply_cluster_threshold(self, max_distance):
+        """取出当前阈值对应级别的分组，每组一行"""
+        if self.clusters is None:
+            return
+
+        firsts, lasts, counts = self.clusters.groups(max_distance)
+        self.similar_pairs = make_table(CLUSTER_DTYPE,
+                                        frame1=self.cluster_frames[firsts],
+                                        frame2=self.cluster_frames[lasts],
+                                        count=counts)
+        self.similar_status_var.set(f"完成! 找到 {len(firsts)} 组相似帧 (共 {int(counts.sum())} 帧)")
+        self.similar_result_count_var.set(f"找到 {len(firsts)} 组相似帧")
+
+        self.update_result_list()
 
     def update_result_list(self):
         """更新结果列表"""
-        # 清空现有内容
-        for item in self.similar_tree.get_children():
-            self.similar_tree.delete(item)
-
-        # 添加新结果
-        for pair in self.similar_pairs:
-            frame1, time1, frame2, time2, similarity = pair
-            self.similar_tree.insert("", tk.END, values=(
-                time1,
-                frame1,
-                time2,
-                frame2,
-                f"{similarity:.2f}"
-            ))
+        score_field = "count" if self.result_mode == "clusters" else "similarity"
+        self.define_result_columns(self.result_mode)
+        self.similar_filter = ResultFilter(self.similar_pairs, self.video_fps, ("frame1", "frame2"), score_field)
+        self.similar_tree.set_data(self.similar_pairs)
 
         # 重置搜索
         self.similar_search_var.set("")
 
     def filter_results(self, *args):
-        """过滤结果列表"""
+        """按搜索框过滤结果列表 (帧号/时间/相似度范围或子串)"""
         # 检查组件是否已初始化
-        if not hasattr(self, 'similar_tree') or not hasattr(self, 'similar_pairs'):
+        if not hasattr(self, 'similar_tree') or getattr(self, 'similar_filter', None) is None:
             return
 
-        search_term = self.similar_search_var.get().lower()
-        if not search_term:
-            self.update_result_list()
-            return
-
-        # 保存原始结果
-        if not hasattr(self, 'original_similar_pairs'):
-            self.original_similar_pairs = self.similar_pairs.copy()
-
-        # 过滤结果
-        filtered_pairs = []
-        for pair in self.original_similar_pairs:
-            frame1, time1, frame2, time2, similarity = pair
-            if (search_term in time1.lower() or
-                    search_term in time2.lower() or
-                    search_term in str(frame1) or
-                    search_term in str(frame2)):
-                filtered_pairs.append(pair)
-
-        # 更新列表
-        self.similar_pairs = filtered_pairs
-        self.update_result_list()
-        self.similar_result_count_var.set(f"找到 {len(filtered_pairs)} 组匹配结果")
+        rows = self.similar_filter.match(self.similar_search_var.get())
+        self.similar_tree.set_order(rows)
+        if rows is None:
+            self.similar_result_count_var.set(f"找到 {len(self.similar_pairs)} 组相似帧")
+        else:
+            self.similar_result_count_var.set(f"找到 {len(rows)} 组匹配结果")
 
-    def on_tree_select(self, event):
+    def on_tree_select(self):
         """当选择结果项时"""
-        selected = self.similar_tree.selection()
-        if not selected:
+        record = self.similar_tree.selected_record()
+        if record is None:
             return
 
-        item = self.similar_tree.item(selected[0])
-        values = item['values']
-
-        if not values or len(values) < 4:
-            return
-
-        # 获取帧号
-        try:
-            frame1 = int(values[1])
-            frame2 = int(values[3])
-        except (ValueError, IndexError):
-            return
+        frame1 = int(record["frame1"])
+        frame2 = int(record["frame2"])
 
         # 显示图像
         self.display_frames(frame1, frame2,
                             self.similar_image_label1, self.similar_image_frame1,
                             self.similar_image_label2, self.similar_image_frame2)
+        self.prefetch_neighbours()
 
         # 更新时间信息
-        self.similar_time_info1.config(text=f"时间位置: {values[0]} | 帧号: {frame1}")
-        self.similar_time_info2.config(text=f"时间位置: {values[2]} | 帧号: {frame2}")
+        self.similar_time_info1.config(text=f"时间位置: {frame_to_time(frame1, self.video_fps)} | 帧号: {frame1}")
+        self.similar_time_info2.config(text=f"时间位置: {frame_to_time(frame2, self.video_fps)} | 帧号: {frame2}")
 
         # 保存当前选择
         self.current_similar_frame_index = frame1
 
     def display_frames(self, frame1, frame2, label1, frame1_container, label2, frame2_container):
         """显示两个帧的图像"""
-        cap = cv2.VideoCapture(self.video_path)
-        if not cap.isOpened():
+        self.show_preview(frame1, label1, frame1_container)
+        self.show_preview(frame2, label2, frame2_container)
+
+    def get_preview(self):
+        """返回当前视频的预览服务，切换视频后重新创建"""
+        if self.preview is None or self.preview.video_path != self.video_path:
+            if self.preview is not None:
+                self.preview.close()
+            self.preview = FramePreviewService(self.video_path)
+        return self.preview
+
+    def show_preview(self, frame_num, label, container, default_size=(300, 200)):
+        """在标签中显示帧预览 (经预览服务缓存)"""
+        image = self.get_preview().get(frame_num, container_size(container, default_size))
+        if image is None:
             return
 
-        # 获取第一帧
-        cap.set(cv2.CAP_PROP_POS_FRAMES, frame1)
-        ret, img1 = cap.read()
-        if ret:
-            self.display_image(img1, label1, frame1_container)
-
-        # 获取第二帧
-        cap.set(cv2.CAP_PROP_POS_FRAMES, frame2)
-        ret, img2 = cap.read()
-        if ret:
-            self.display_image(img2, label2, frame2_container)
-
-        cap.release()
-
-    def display_image(self, cv_img, label, container):
-        """在标签中显示OpenCV图像"""
-        # 转换为RGB
-        cv_img = cv2.cvtColor(cv_img, cv2.COLOR_BGR2RGB)
-
-        # 调整大小以适应容器
-        h, w = cv_img.shape[:2]
-        container_width = max(1, container.winfo_width())
-        container_height = max(1, container.winfo_height())
-
-        # 确保容器有有效尺寸
-        if container_width < 10 or container_height < 10:
-            container_width = 300
-            container_height = 200
-
-        scale = min(container_width / w, container_height / h)
-        new_w = int(w * scale)
-        new_h = int(h * scale)
-
-        cv_img = cv2.resize(cv_img, (new_w, new_h))
-
-        # 转换为Tkinter图像
-        img = Image.fromarray(cv_img)
-        img_tk = ImageTk.PhotoImage(img)
-
-        # 更新标签
+        img_tk = ImageTk.PhotoImage(image)
         label.config(image=img_tk)
         label.image = img_tk  # 保持引用
 
+    def prefetch_neighbours(self):
+        """在后台预取相邻结果行的两帧预览"""
+        size1 = container_size(self.similar_image_frame1, (300, 200))
+        size2 = container_size(self.similar_image_frame2, (300, 200))
+        requests = []
+        for record in self.similar_tree.neighbours(PREVIEW_DEFAULTS["prefetch_rows"]):
+            requests.append((int(record["frame1"]), size1))
+            requests.append((int(record["frame2"]), size2))
+        self.get_preview().prefetch(requests)
+
     def export_current_frame(self):
         """导出当前显示的帧"""
         if self.current_similar_frame_index < 0:
@@ -466,7 +552,8 @@ class SimilarFrameTab:
         cap.release()
 
         if ret:
-            cv2.imwrite(file_path, frame)
+            image_format = "png" if file_path.lower().endswith(".png") else "jpg"
+            cv2.imwrite(file_path, frame, imwrite_params(image_format))
             messagebox.showinfo("成功", f"帧已保存至:\n{file_path}")
         else:
             messagebox.showerror("错误", "无法获取当前帧")
@@ -483,4 +570,57 @@ class SimilarFrameTab:
 
         # 显示消息
         messagebox.showinfo("操作提示",
-                            f"在视频播放器中打开此视频\n跳转到时间位置: {time_str}")
\ No newline at end of file
+                            f"在视频播放器中打开此视频\n跳转到时间位置: {time_str}")
+
+    def export_all_frames(self):
+        """把当前列表中的所有帧导出为图片，导出过程中再次点击则取消"""
+        if self.frame_export_job is not None and self.frame_export_job.running:
+            self.frame_export_job.cancel()
+            self.similar_status_var.set("正在取消...")
+            return
+
+        if not len(self.similar_tree):
+            messagebox.showinfo("提示", "没有可导出的结果")
+            return
+
+        # 分组模式下每组只导出代表帧
+        records = self.similar_tree.records()
+        frames = records["frame1"].tolist()
+        if self.result_mode != "clusters":
+            frames += records["frame2"].tolist()
+        settings = FrameExportDialog(self.parent, len(set(frames))).show()
+        if not settings:
+            return
+
+        output_dir = settings["output_dir"]
+        self.frame_export_job = FrameExportJob(
+            self.video_path, frames, **settings,
+            max_gap_frames=SEGMENT_EXPORT_DEFAULTS["max_gap_frames"],
+            progress_callback=lambda completed, total: self.channel.call(self.update_frame_export_progress,
+                                                                         completed, total),
+            done_callback=lambda status, error: self.channel.call(self.finish_frame_export, output_dir, status, error))
+        self.export_frames_btn.config(text="取消导出帧")
+        self.similar_status_var.set(f"开始导出 {self.frame_export_job.total} 帧...")
+        self.frame_export_job.start()
+
+    def update_frame_export_progress(self, completed, total):
+        """更新帧导出进度"""
+        self.similar_progress_var.set((completed / max(1, total)) * 100)
+        self.similar_status_var.set(f"导出帧: {completed}/{total}...")
+
+    def finish_frame_export(self, output_dir, status, error):
+        """帧导出结束"""
+        completed = self.frame_export_job.completed if self.frame_export_job is not None else 0
+        self.frame_export_job = None
+        self.export_frames_btn.config(text="批量导出帧")
+
+        if status == "done":
+            self.similar_status_var.set(f"已导出 {completed} 帧至: {output_dir}")
+            messagebox.showinfo("成功", f"已导出 {completed} 帧!\n{output_dir}")
+        elif status == "partial":
+            self.similar_status_var.set(f"已导出 {completed} 帧至: {output_dir} ({error})")
+            messagebox.showwarning("部分完成", f"已导出 {completed} 帧，{error}\n{output_dir}")
+        elif status == "cancelled":
+            self.similar_status_var.set(f"已取消导出，完成 {completed} 帧")
+        else:
+            messagebox.showerror("导出错误", f"批量导出帧时出错:\n{error}")
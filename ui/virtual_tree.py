@@ -0,0 +1,258 @@
+import tkinter as tk
+from tkinter import ttk
+
+import numpy as np
+
+from utils.helpers import sort_rows
+
+
+class VirtualTreeview:
+    """虚拟化的结果列表: 数据保存在NumPy结构化数组中，Treeview只保留一屏的行条目并在滚动时复用"""
+
+    def __init__(self, parent, columns, on_select=None):
+        self.frame = ttk.Frame(parent)
+        self.tree = ttk.Treeview(self.frame, columns=columns, show="headings", selectmode="browse")
+        self.scrollbar = ttk.Scrollbar(self.frame, orient=tk.VERTICAL, command=self.yview)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.tree.pack(fill=tk.BOTH, expand=True)
+
+        self.columns = columns
+        self.on_select = on_select
+        self.fields = {}
+        self.formatters = {}
+        self.default_reverse = {}
+
+        self.data = None
+        # 当前显示顺序 (过滤、排序后) 中每一行对应的数据下标
+        self.order = np.empty(0, dtype=np.int64)
+        self.offset = 0
+        self.page_size = 20
+        self.row_metrics = None
+        self.items = []
+        # 每个行条目当前显示的数据下标，未变化的条目不重新写入
+        self.item_rows = []
+        self.selected = -1
+        self.sort_column = None
+        self.sort_reverse = False
+        # 全部数据按当前排序列排好的下标，过滤时直接从中挑选而不重新排序
+        self.sorted_rows = None
+
+        self.tree.bind("<<TreeviewSelect>>", self._on_tree_select)
+        self.tree.bind("<Configure>", self._on_configure)
+        self.tree.bind("<MouseWheel>", self._on_mouse_wheel)
+        self.tree.bind("<Button-4>", lambda event: self._scroll_by(-3))
+        self.tree.bind("<Button-5>", lambda event: self._scroll_by(3))
+        for key, delta in (("<Up>", -1), ("<Down>", 1)):
+            self.tree.bind(key, lambda event, delta=delta: self._move_selection(delta))
+        self.tree.bind("<Prior>", lambda event: self._move_selection(-self.page_size))
+        self.tree.bind("<Next>", lambda event: self._move_selection(self.page_size))
+        self.tree.bind("<Home>", lambda event: self._move_selection(-len(self.order)))
+        self.tree.bind("<End>", lambda event: self._move_selection(len(self.order)))
+
+    def pack(self, **kwargs):
+        self.frame.pack(**kwargs)
+
+    def column(self, column, text, width, field=None, formatter=None, reverse=False):
+        """定义列: field为排序使用的数据字段，formatter把一条记录转换为显示文本，reverse为首次点击时是否倒序"""
+        self.fields[column] = field or column
+        self.formatters[column] = formatter or (lambda record, name=self.fields[column]: str(record[name]))
+        self.default_reverse[column] = reverse
+        self.tree.heading(column, text=text, command=lambda: self.sort(column))
+        self.tree.column(column, width=width, anchor=tk.CENTER)
+
+    def __len__(self):
+        return len(self.order)
+
+    def set_data(self, data):
+        """替换全部数据并显示所有行，保留当前的排序列"""
+        self.data = data
+        self.selected = -1
+        self.offset = 0
+        self.sorted_rows = None
+        self.item_rows = [None] * len(self.items)
+        self.order = self._all_rows()
+        self._render()
+
+    def clear(self):
+        self.set_data(None)
+
+    def set_order(self, rows=None):
+        """只显示指定下标的数据 (None为全部)，按当前排序列排序，显示内容不变时不刷新"""
+        if self.data is None:
+            return
+        order = self._all_rows()
+        if rows is not None:
+            mask = np.zeros(len(self.data), dtype=bool)
+            mask[rows] = True
+            order = order[mask[order]]
+            if self.selected >= 0 and not mask[self.selected]:
+                self.selected = -1
+        if np.array_equal(order, self.order):
+            return
+
+        self.order = order
+        self.offset = 0
+        self._scroll_to_selection()
+        self._render()
+
+    def sort(self, column, reverse=None):
+        """按列排序，reverse为None时再次点击同一列切换方向"""
+        if reverse is None:
+            reverse = not self.sort_reverse if column == self.sort_column else self.default_reverse[column]
+        self.sort_column, self.sort_reverse = column, reverse
+        self.sorted_rows = None
+        if self.data is not None and len(self.order):
+            self.order = sort_rows(self.order, self.data[self.fields[column]][self.order], reverse)
+        self._scroll_to_selection()
+        self._render()
+
+    def _all_rows(self):
+        """全部数据按当前排序列排列的下标"""
+        if self.data is None:
+            return np.empty(0, dtype=np.int64)
+        if self.sorted_rows is None:
+            rows = np.arange(len(self.data), dtype=np.int64)
+            if self.sort_column is not None:
+                rows = sort_rows(rows, self.data[self.fields[self.sort_column]], self.sort_reverse)
+            self.sorted_rows = rows
+        return self.sorted_rows
+
+    def records(self):
+        """按当前显示顺序返回所有行的数据"""
+        if self.data is None:
+            return None
+        return self.data[self.order]
+
+    def selected_record(self):
+        if self.data is None or self.selected < 0:
+            return None
+        return self.data[self.selected]
+
+    def neighbours(self, count):
+        """选中行前后各count行的数据，按距离由近到远交替排列"""
+        position = self._selected_position()
+        if position < 0:
+            return []
+        rows = []
+        for distance in range(1, count + 1):
+            for neighbour in (position + distance, position - distance):
+                if 0 <= neighbour < len(self.order):
+                    rows.append(self.data[self.order[neighbour]])
+        return rows
+
+    def _selected_position(self):
+        if self.selected < 0:
+            return -1
+        positions = np.flatnonzero(self.order == self.selected)
+        return int(positions[0]) if len(positions) else -1
+
+    def yview(self, *args):
+        """滚动条回调"""
+        if args[0] == "moveto":
+            self._scroll_to(int(float(args[1]) * len(self.order)))
+        elif args[0] == "scroll":
+            step = self.page_size if args[2] == "pages" else 1
+            self._scroll_by(int(args[1]) * step)
+
+    def _scroll_by(self, rows):
+        self._scroll_to(self.offset + rows)
+        return "break"
+
+    def _scroll_to(self, offset):
+        offset = max(0, min(offset, len(self.order) - self.page_size))
+        if offset != self.offset:
+            self.offset = offset
+            self._render()
+
+    def _scroll_to_selection(self):
+        position = self._selected_position()
+        if position < 0:
+            return
+        if position < self.offset:
+            self.offset = position
+        elif position >= self.offset + self.page_size:
+            self.offset = position - self.page_size + 1
+        self.offset = max(0, min(self.offset, len(self.order) - self.page_size))
+
+    def _on_mouse_wheel(self, event):
+        return self._scroll_by(-3 if event.delta > 0 else 3)
+
+    def _move_selection(self, delta):
+        if not len(self.order):
+            return "break"
+        position = self._selected_position()
+        position = max(0, min(len(self.order) - 1, position + delta if position >= 0 else 0))
+        self.selected = int(self.order[position])
+        self._scroll_to_selection()
+        self._render()
+        if self.on_select:
+            self.on_select()
+        return "break"
+
+    def _on_tree_select(self, event):
+        # 重新显示时程序设置的选中状态与已选行相同，不重复回调
+        selection = self.tree.selection()
+        if not selection or selection[0] not in self.items:
+            return
+        position = self.offset + self.items.index(selection[0])
+        if position >= len(self.order) or int(self.order[position]) == self.selected:
+            return
+        self.selected = int(self.order[position])
+        if self.on_select:
+            self.on_select()
+
+    def _on_configure(self, event):
+        self._update_page_size(event.height)
+
+    def _measure_rows(self):
+        """从第一行的位置得到表头高度和行高"""
+        if self.row_metrics is None and self.items:
+            bbox = self.tree.bbox(self.items[0])
+            if bbox:
+                self.row_metrics = (bbox[1], bbox[3])
+                self._update_page_size(self.tree.winfo_height())
+
+    def _update_page_size(self, height):
+        # 未显示过任何行时按默认行高估计
+        header, row_height = self.row_metrics or (25, 20)
+        page_size = max(1, (height - header) // row_height)
+        if page_size != self.page_size:
+            self.page_size = page_size
+            self.offset = max(0, min(self.offset, len(self.order) - self.page_size))
+            self._render()
+
+    def _render(self):
+        """把当前页的数据写入复用的行条目"""
+        count = max(0, min(self.page_size, len(self.order) - self.offset))
+        while len(self.items) < count:
+            self.items.append(self.tree.insert("", tk.END))
+            self.item_rows.append(None)
+        while len(self.items) > count:
+            self.tree.delete(self.items.pop())
+            self.item_rows.pop()
+
+        selected_item = ""
+        rows = self.order[self.offset:self.offset + count].tolist()
+        for index, (item, row) in enumerate(zip(self.items, rows)):
+            if self.item_rows[index] != row:
+                record = self.data[row]
+                self.tree.item(item, values=[self.formatters[column](record) for column in self.columns])
+                self.item_rows[index] = row
+            if row == self.selected:
+                selected_item = item
+
+        if selected_item:
+            if self.tree.selection() != (selected_item,):
+                self.tree.selection_set(selected_item)
+            self.tree.focus(selected_item)
+        elif self.tree.selection():
+            self.tree.selection_set(())
+
+        if self.row_metrics is None and self.items:
+            self.tree.after_idle(self._measure_rows)
+
+        total = len(self.order)
+        if total:
+            self.scrollbar.set(self.offset / total, min(1.0, (self.offset + count) / total))
+        else:
+            self.scrollbar.set(0, 1)
@@ -0,0 +1,79 @@
+"""近似最近邻索引模块
+
+对降采样后的帧描述子做随机投影局部敏感哈希 (LSH): 每张表用若干随机超平面把描述子
+映射为一个比特桶号，余弦相似的描述子大概率落入同一个桶。查询时只取各表同桶的帧，
+按碰撞次数排序后取前若干个，候选数量不随搜索窗口变长而增加。
+条目按插入顺序 (帧号递增) 保存，可以随搜索窗口滑动淘汰最旧的帧。
+"""
+from collections import Counter, OrderedDict
+
+import cv2
+import numpy as np
+
+from utils.self_similarity import frame_descriptor
+
+
+def embed_gray(gray, width):
+    """把灰度图缩小到指定宽度并转换为归一化描述子"""
+    h, w = gray.shape[:2]
+    if w > width:
+        gray = cv2.resize(gray, (width, max(1, int(h * width / w))), interpolation=cv2.INTER_AREA)
+    return frame_descriptor(gray)
+
+
+class RandomProjectionLSH:
+    """随机投影LSH索引，条目键需按递增顺序插入"""
+
+    def __init__(self, dim, num_tables=8, num_bits=12, seed=0):
+        rng = np.random.default_rng(seed)
+        self.num_tables = num_tables
+        self.num_bits = num_bits
+        self.planes = rng.standard_normal((dim, num_tables * num_bits)).astype(np.float32)
+        self.bit_weights = 1 << np.arange(num_bits, dtype=np.int64)
+        self.tables = [{} for _ in range(num_tables)]
+        # 键 -> 各表桶号，按插入顺序保存
+        self.entries = OrderedDict()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _bucket_keys(self, vector):
+        bits = (np.asarray(vector, dtype=np.float32) @ self.planes) > 0
+        return (bits.reshape(self.num_tables, self.num_bits) @ self.bit_weights).tolist()
+
+    def add(self, key, vector):
+        """插入一个条目"""
+        buckets = self._bucket_keys(vector)
+        for table, bucket in zip(self.tables, buckets):
+            table.setdefault(bucket, set()).add(key)
+        self.entries[key] = buckets
+
+    def remove(self, key):
+        """删除一个条目"""
+        buckets = self.entries.pop(key)
+        for table, bucket in zip(self.tables, buckets):
+            members = table[bucket]
+            members.discard(key)
+            if not members:
+                del table[bucket]
+
+    def discard_oldest(self):
+        """删除最早插入的条目"""
+        if self.entries:
+            self.remove(next(iter(self.entries)))
+
+    def evict_before(self, key):
+        """删除键小于key的条目"""
+        while self.entries and next(iter(self.entries)) < key:
+            self.remove(next(iter(self.entries)))
+
+    def query(self, vector, max_candidates=None):
+        """返回与vector同桶的条目键，碰撞次数多的在前"""
+        votes = Counter()
+        for table, bucket in zip(self.tables, self._bucket_keys(vector)):
+            members = table.get(bucket)
+            if members:
+                votes.update(members)
+
+        ranked = sorted(votes, key=lambda key: (-votes[key], key))
+        return ranked[:max_candidates] if max_candidates else ranked
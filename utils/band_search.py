@@ -0,0 +1,78 @@
+"""时间窗口相似帧查找模块
+
+只比较时间间隔不超过给定帧数的帧对。指纹流经过时，每个新采样帧只与环形缓存中窗口内的
+最近若干帧比较，超出窗口的帧随即淘汰，复杂度为O(n·w)，可以在解码的同时完成查找。
+"""
+import numpy as np
+
+from utils.fingerprint import HASH_BITS
+from utils.frame_ring import FrameRingBuffer
+from utils.hamming import max_accepted_distance, popcount64
+
+
+# 累积多少个采样帧的结果后合并为一块
+DEFAULT_BLOCK_SAMPLES = 1024
+
+
+class BandedPairSearch:
+    """滑动时间窗口内的相似帧对查找，结果下标为采样顺序 (与收集到的指纹数组对应)"""
+
+    def __init__(self, max_gap_frames, frame_skip, threshold, block_samples=DEFAULT_BLOCK_SAMPLES):
+        self.max_gap_frames = max_gap_frames
+        self.max_distance = max_accepted_distance(threshold, HASH_BITS)
+        self.block_samples = block_samples
+        # 窗口内最多容纳的采样帧数
+        self.window = FrameRingBuffer(max_gap_frames // max(1, frame_skip) + 1)
+        self.count = 0
+        self.pending = []
+        self.blocks = []
+
+    def observe(self, samples):
+        """原样转发 (帧号, 打包哈希, 缩略图) 指纹流，同时与窗口内的帧比较"""
+        for sample in samples:
+            self.push(sample[0], sample[1])
+            yield sample
+        self.flush()
+
+    def push(self, frame_num, frame_hash):
+        """加入一个采样帧，记录它与窗口内各帧中满足阈值的帧对"""
+        self.window.evict_before(frame_num - self.max_gap_frames)
+        if len(self.window):
+            slots = self.window.slots()
+            distances = popcount64(self.window.lookup("hash", slots) ^ np.uint64(frame_hash))
+            matched = np.flatnonzero(distances <= self.max_distance)
+            if len(matched):
+                self.pending.append((self.window.lookup("index", slots[matched]), self.count,
+                                     distances[matched]))
+
+        self.window.push(frame_num, {"hash": np.uint64(frame_hash), "index": self.count})
+        self.count += 1
+        if self.count % self.block_samples == 0:
+            self.flush()
+
+    def flush(self):
+        """把累积的结果合并为一块"""
+        if not self.pending:
+            return
+        rows = np.concatenate([block_rows for block_rows, _, _ in self.pending])
+        cols = np.repeat([col for _, col, _ in self.pending],
+                         [len(block_rows) for block_rows, _, _ in self.pending])
+        distances = np.concatenate([block_distances for _, _, block_distances in self.pending])
+        self.blocks.append((rows.astype(np.int64), cols.astype(np.int64), distances.astype(np.uint8)))
+        self.pending = []
+
+    def pairs(self):
+        """返回按 (j, i) 排序的 (下标i数组, 下标j数组, 距离数组)"""
+        self.flush()
+        if not self.blocks:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0, dtype=np.uint8)
+        rows, cols, distances = zip(*self.blocks)
+        return np.concatenate(rows), np.concatenate(cols), np.concatenate(distances)
+
+
+def find_banded_pairs(frame_numbers, hashes, max_gap_frames, frame_skip, threshold):
+    """在已收集的指纹上做时间窗口查找 (如按新阈值重新查找)，返回值与pairs()相同"""
+    search = BandedPairSearch(max_gap_frames, frame_skip, threshold)
+    for frame_num, frame_hash in zip(frame_numbers.tolist(), hashes.tolist()):
+        search.push(frame_num, frame_hash)
+    return search.pairs()
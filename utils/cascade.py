@@ -0,0 +1,141 @@
+"""多级比较模块
+
+候选帧依次经过由粗到细的比较阶段 (亮度直方图 -> 平均哈希 -> SSIM)，
+廉价的阶段先淘汰明显不同的帧，只有通过所有前置阶段的候选才计算SSIM。
+每个阶段记录处理数量和淘汰数量，用于查看时间花在哪里。
+"""
+import cv2
+import numpy as np
+
+from utils.hamming import popcount64
+from utils.ssim import ssim_batch
+
+
+# 直方图分箱数量
+HISTOGRAM_BINS = 32
+
+
+def luma_histogram(gray):
+    """计算归一化的亮度直方图"""
+    hist = cv2.calcHist([gray], [0], None, [HISTOGRAM_BINS], [0, 256]).ravel()
+    return hist / max(1.0, float(hist.sum()))
+
+
+class ComparisonStage:
+    """比较阶段基类: features为该阶段需要的特征名称"""
+
+    name = ""
+    features = ()
+
+    def __init__(self):
+        self.seen = 0
+        self.rejected = 0
+
+    def score(self, query, *candidates):
+        """计算查询帧与候选帧的分数"""
+        raise NotImplementedError
+
+    def passes(self, scores):
+        """返回通过本阶段的候选掩码"""
+        raise NotImplementedError
+
+    @property
+    def rejection_rate(self):
+        return self.rejected / self.seen if self.seen else 0.0
+
+
+class HistogramStage(ComparisonStage):
+    """亮度直方图距离 (总变差距离，0-1)"""
+
+    name = "直方图"
+    features = ("hist",)
+
+    def __init__(self, max_distance):
+        super().__init__()
+        self.max_distance = max_distance
+
+    def score(self, query, hists):
+        return 0.5 * np.abs(hists - query["hist"]).sum(axis=1)
+
+    def passes(self, scores):
+        return scores <= self.max_distance
+
+
+class HashStage(ComparisonStage):
+    """平均哈希汉明距离"""
+
+    name = "哈希"
+    features = ("hash",)
+
+    def __init__(self, max_distance):
+        super().__init__()
+        self.max_distance = max_distance
+
+    def score(self, query, hashes):
+        return popcount64(hashes ^ np.uint64(query["hash"]))
+
+    def passes(self, scores):
+        return scores <= self.max_distance
+
+
+class SSIMStage(ComparisonStage):
+    """SSIM (使用缓存的局部均值和方差批量计算)"""
+
+    name = "SSIM"
+    features = ("gray", "mean", "variance")
+
+    def __init__(self, threshold):
+        super().__init__()
+        self.threshold = threshold
+
+    def score(self, query, grays, means, variances):
+        return ssim_batch(query["gray"], grays, means, variances, (query["mean"], query["variance"]))
+
+    def passes(self, scores):
+        return scores >= self.threshold
+
+
+class ComparisonCascade:
+    """依次执行各比较阶段，返回通过所有阶段的候选及最后一个阶段的分数"""
+
+    def __init__(self, stages):
+        self.stages = stages
+
+    def features(self):
+        """各阶段需要的特征名称"""
+        return {name for stage in self.stages for name in stage.features}
+
+    def run(self, query, keys, lookup):
+        """query为查询帧的特征字典，keys为候选键数组，lookup(特征名, 键数组) 返回候选特征数组"""
+        keys = np.asarray(keys)
+        scores = np.empty(0)
+        for stage in self.stages:
+            if len(keys) == 0:
+                return keys, np.empty(0)
+
+            scores = stage.score(query, *[lookup(name, keys) for name in stage.features])
+            mask = stage.passes(scores)
+
+            stage.seen += len(keys)
+            stage.rejected += len(keys) - int(np.count_nonzero(mask))
+
+            keys = keys[mask]
+            scores = scores[mask]
+
+        return keys, scores
+
+    def summary(self):
+        """各阶段淘汰率的文字说明"""
+        return " | ".join(f"{stage.name}淘汰 {stage.rejection_rate:.0%} (共{stage.seen})"
+                          for stage in self.stages)
+
+
+def build_loop_cascade(ssim_threshold, settings):
+    """按配置构建循环检测使用的比较阶段"""
+    stages = []
+    if settings.get("histogram_max_distance") is not None:
+        stages.append(HistogramStage(settings["histogram_max_distance"]))
+    if settings.get("hash_max_distance") is not None:
+        stages.append(HashStage(settings["hash_max_distance"]))
+    stages.append(SSIMStage(ssim_threshold))
+    return ComparisonCascade(stages)
@@ -0,0 +1,96 @@
+"""相似帧聚类模块
+
+把满足阈值的帧对看作图的边，用向量化的并查集求连通分量，每个连通分量输出为一组相似帧。
+帧对逐块产生后立即合并，不保存帧对本身，静态画面下内存占用只与采样帧数成正比。
+
+每个汉明距离级别各维护一份分量标签 (只合并距离恰好等于该级别的边)，分析结束后由低到高逐级并入，
+得到 "距离不超过d" 的连通分量。调整阈值时直接取对应级别的标签，无需重新分析。
+"""
+import numpy as np
+
+from utils.fingerprint import iter_candidate_blocks, HASH_BITS
+from utils.hamming import max_accepted_distance
+
+
+def union_edges(labels, rows, cols):
+    """把边 (rows[k], cols[k]) 合并进分量标签
+
+    labels[i] 为i所在分量的最小下标 (调用前后都保持完全压缩)。每轮把较大的根挂到较小的根下，
+    再做指针跳跃压缩，直到所有边的两端标签相同。
+    """
+    rows = np.asarray(rows, dtype=np.int64)
+    cols = np.asarray(cols, dtype=np.int64)
+    while len(rows):
+        roots_a, roots_b = labels[rows], labels[cols]
+        pending = roots_a != roots_b
+        if not pending.any():
+            break
+        rows, cols = rows[pending], cols[pending]
+        roots_a, roots_b = roots_a[pending], roots_b[pending]
+        np.minimum.at(labels, np.maximum(roots_a, roots_b), np.minimum(roots_a, roots_b))
+
+        while True:
+            jumped = labels[labels]
+            if np.array_equal(jumped, labels):
+                break
+            labels[:] = jumped
+
+
+class DistanceClusters:
+    """按汉明距离级别保存的连通分量标签"""
+
+    def __init__(self, count, max_distance):
+        self.count = count
+        self.max_distance = max_distance
+        self.labels = np.tile(np.arange(count, dtype=np.int64), (max(0, max_distance) + 1, 1))
+
+    def add_edges(self, rows, cols, distances):
+        """合并一批帧对，每条边只进入其距离对应的级别"""
+        distances = np.asarray(distances)
+        present = np.bincount(distances, minlength=self.max_distance + 1)[:self.max_distance + 1]
+        for distance in np.flatnonzero(present).tolist():
+            mask = distances == distance
+            union_edges(self.labels[distance], rows[mask], cols[mask])
+
+    def finish(self):
+        """由低到高把上一级别的分量并入当前级别"""
+        members = np.arange(self.count, dtype=np.int64)
+        for distance in range(1, self.max_distance + 1):
+            union_edges(self.labels[distance], members, self.labels[distance - 1])
+
+    def groups(self, max_distance):
+        """距离不超过max_distance时至少包含两帧的分组，返回 (首个成员下标, 最后成员下标, 成员数)"""
+        empty = np.empty(0, dtype=np.int64)
+        if max_distance < 0 or not self.count:
+            return empty, empty, empty
+
+        labels = self.labels[min(max_distance, self.max_distance)]
+        counts = np.bincount(labels, minlength=self.count)
+        last = np.zeros(self.count, dtype=np.int64)
+        np.maximum.at(last, labels, np.arange(self.count, dtype=np.int64))
+
+        # 标签即分量中的最小下标，也就是最早的成员
+        firsts = np.flatnonzero(counts >= 2)
+        return firsts, last[firsts], counts[firsts]
+
+
+def find_similar_clusters(hashes, threshold, progress_callback=None, method="matrix"):
+    """按最大阈值逐块查找相似帧对并直接聚类，返回DistanceClusters"""
+    total = len(hashes)
+    clusters = DistanceClusters(total, max_accepted_distance(threshold, HASH_BITS))
+
+    for done, rows, cols, distances in iter_candidate_blocks(hashes, threshold, method):
+        clusters.add_edges(np.asarray(rows, dtype=np.int64), np.asarray(cols, dtype=np.int64), distances)
+        if progress_callback:
+            progress_callback(done - 1, total)
+
+    clusters.finish()
+    return clusters
+
+
+def clusters_from_pairs(count, rows, cols, distances, threshold):
+    """把已找到的帧对 (如时间窗口查找的结果) 按最大阈值聚类，返回DistanceClusters"""
+    clusters = DistanceClusters(count, max_accepted_distance(threshold, HASH_BITS))
+    clusters.add_edges(np.asarray(rows, dtype=np.int64), np.asarray(cols, dtype=np.int64), distances)
+    clusters.finish()
+    return clusters
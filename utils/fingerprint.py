@@ -0,0 +1,141 @@
+"""帧指纹模块
+
+每个采样帧只计算一次平均哈希，并打包为64位整数，后续的两两比较只在打包后的哈希上进行。
+"""
+from functools import partial
+
+import cv2
+import numpy as np
+
+from utils.helpers import calculate_frame_hash
+from utils.hamming import iter_similar_blocks, max_accepted_distance
+from utils.hash_index import iter_index_blocks, index_is_faster
+from utils.sampler import iter_sampled_frames
+from utils.pipeline import FramePipeline
+
+
+# 平均哈希的位数 (8x8)
+HASH_BITS = 64
+
+
+def hash_to_int(image_hash):
+    """将imagehash.ImageHash打包为整数"""
+    value = 0
+    for bit in image_hash.hash.flatten():
+        value = (value << 1) | int(bit)
+    return value
+
+
+def fingerprint_frame(frame):
+    """计算单帧的打包哈希"""
+    return hash_to_int(calculate_frame_hash(frame))
+
+
+def make_thumbnail(frame, max_width):
+    """生成灰度缩略图，宽度超过max_width时按比例缩小"""
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    h, w = gray.shape[:2]
+    if w > max_width:
+        scale = max_width / w
+        gray = cv2.resize(gray, (max_width, int(h * scale)))
+    return gray
+
+
+class VideoFingerprints:
+    """一个视频在给定采样间隔下的指纹: 帧号、打包哈希和可选的灰度缩略图"""
+
+    def __init__(self, frame_numbers, hashes, thumbnails=None):
+        self.frame_numbers = frame_numbers
+        self.hashes = hashes
+        self.thumbnails = thumbnails
+
+    def __len__(self):
+        return len(self.frame_numbers)
+
+
+def fingerprint_sample(sample, thumb_width=None):
+    """将 (帧号, 帧) 转换为 (帧号, 打包哈希, 缩略图或None)"""
+    frame_num, frame = sample
+    thumbnail = make_thumbnail(frame, thumb_width) if thumb_width else None
+    return frame_num, fingerprint_frame(frame), thumbnail
+
+
+def iter_video_fingerprints(cap, frame_skip, thumb_width=None, progress_callback=None):
+    """边解码边计算指纹，逐个返回 (帧号, 打包哈希, 缩略图或None)，解码后的帧立即丢弃
+
+    解码在单独的线程中进行，哈希计算交给线程池并行处理，结果按帧号顺序返回。
+    """
+    samples = iter_sampled_frames(cap, frame_skip, progress_callback=progress_callback)
+    pipeline = FramePipeline(partial(fingerprint_sample, thumb_width=thumb_width))
+    yield from pipeline.run(samples)
+
+
+def collect_fingerprints(samples, expected_count=0):
+    """将指纹流收集为VideoFingerprints，数组按预计采样数预分配，不足时扩容"""
+    capacity = max(16, expected_count)
+    frame_numbers = np.empty(capacity, dtype=np.int64)
+    hashes = np.empty(capacity, dtype=np.uint64)
+    thumbnails = None
+    count = 0
+
+    for frame_num, frame_hash, thumbnail in samples:
+        if count == capacity:
+            capacity *= 2
+            frame_numbers = np.resize(frame_numbers, capacity)
+            hashes = np.resize(hashes, capacity)
+            if thumbnails is not None:
+                thumbnails = np.resize(thumbnails, (capacity,) + thumbnails.shape[1:])
+
+        if thumbnail is not None and thumbnails is None:
+            thumbnails = np.empty((capacity,) + thumbnail.shape, dtype=np.uint8)
+
+        frame_numbers[count] = frame_num
+        hashes[count] = frame_hash
+        if thumbnails is not None:
+            thumbnails[count] = thumbnail
+        count += 1
+
+    return VideoFingerprints(frame_numbers[:count].copy(), hashes[:count].copy(),
+                             None if thumbnails is None else thumbnails[:count].copy())
+
+
+def hash_distance(hash1, hash2):
+    """两个打包哈希之间的汉明距离"""
+    return bin(int(hash1) ^ int(hash2)).count("1")
+
+
+def hash_similarity(distance):
+    """将汉明距离转换为相似度 (与 1 - distance / len(hash) 一致)"""
+    return 1 - (distance / HASH_BITS)
+
+
+def iter_candidate_blocks(hashes, threshold, method="matrix"):
+    """按查找方式逐块返回满足阈值的帧对 (已完成行数, 下标i数组, 下标j数组, 距离数组)
+
+    查询半径较大时多索引哈希需要枚举的翻转过多，此时即使选择了"index"也改用分块矩阵。
+    """
+    max_distance = max_accepted_distance(threshold, HASH_BITS)
+    if method == "index" and index_is_faster(len(hashes), max_distance, HASH_BITS):
+        return iter_index_blocks(hashes, max_distance)
+    return iter_similar_blocks(hashes, threshold, HASH_BITS)
+
+
+def find_candidate_pairs(hashes, threshold, progress_callback=None, method="matrix"):
+    """在打包哈希上查找满足阈值的帧对，返回 i < j 的 (下标i数组, 下标j数组, 距离数组)
+
+    method为"matrix"时分块计算完整距离矩阵，为"index"时在多索引哈希的各段上做桶连接。
+    """
+    total = len(hashes)
+    rows, cols, distances = [], [], []
+
+    for done, block_rows, block_cols, block_distances in iter_candidate_blocks(hashes, threshold, method):
+        rows.append(np.asarray(block_rows, dtype=np.int64))
+        cols.append(np.asarray(block_cols, dtype=np.int64))
+        distances.append(np.asarray(block_distances, dtype=np.uint8))
+
+        if progress_callback:
+            progress_callback(done - 1, total)
+
+    if not rows:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0, dtype=np.uint8)
+    return np.concatenate(rows), np.concatenate(cols), np.concatenate(distances)
@@ -0,0 +1,197 @@
+"""指纹磁盘缓存模块
+
+按 (视频路径, 大小, 修改时间, 采样参数) 为每个视频保存一份指纹文件:
+帧号、打包哈希和可选的灰度缩略图各存为一个 .npy，读取时以内存映射方式打开，
+再次分析同一个视频时无需重新解码。缓存总大小有上限，超出时按最近使用时间 (元数据文件的修改时间)
+删除最久未使用的视频的缓存。
+"""
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from config.constants import FINGERPRINT_CACHE
+from utils.fingerprint import VideoFingerprints
+
+
+# 缓存格式版本，指纹算法变化时递增
+CACHE_VERSION = 1
+
+_ARRAY_NAMES = ("frames", "hashes", "thumbs")
+
+
+def cache_key(video_path, frame_skip, thumb_width=None):
+    """根据视频文件信息和采样参数生成缓存键"""
+    stat = os.stat(video_path)
+    identity = [CACHE_VERSION, os.path.abspath(video_path), stat.st_size, stat.st_mtime_ns,
+                frame_skip, thumb_width]
+    return hashlib.sha1(json.dumps(identity).encode("utf-8")).hexdigest()
+
+
+def _cache_path(key, name, cache_dir):
+    return os.path.join(cache_dir, f"{key}.{name}.npy")
+
+
+def _meta_path(key, cache_dir):
+    return os.path.join(cache_dir, f"{key}.json")
+
+
+def load_fingerprints(video_path, frame_skip, thumb_width=None, cache_dir=None):
+    """读取缓存的指纹 (内存映射)，没有可用缓存时返回None"""
+    cache_dir = cache_dir or FINGERPRINT_CACHE["dir"]
+    try:
+        key = cache_key(video_path, frame_skip, thumb_width)
+        with open(_meta_path(key, cache_dir), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+
+        count = meta["count"]
+        arrays = {}
+        for name in _ARRAY_NAMES:
+            path = _cache_path(key, name, cache_dir)
+            if os.path.exists(path):
+                arrays[name] = np.load(path, mmap_mode="r")[:count]
+        # 记录最近使用时间
+        os.utime(_meta_path(key, cache_dir))
+    except (OSError, ValueError, KeyError):
+        return None
+
+    if "frames" not in arrays or "hashes" not in arrays:
+        return None
+    if thumb_width and "thumbs" not in arrays:
+        return None
+    return VideoFingerprints(arrays["frames"], arrays["hashes"], arrays.get("thumbs"))
+
+
+class FingerprintCacheWriter:
+    """边分析边写入指纹缓存，全部写完后调用commit()生效"""
+
+    def __init__(self, video_path, frame_skip, expected_count, thumb_width=None, cache_dir=None):
+        self.cache_dir = cache_dir or FINGERPRINT_CACHE["dir"]
+        self.max_bytes = FINGERPRINT_CACHE["max_bytes"]
+        self.key = cache_key(video_path, frame_skip, thumb_width)
+        # 帧数估计可能不准，预留一些余量
+        self.capacity = max(16, int(expected_count * 1.1) + 16)
+        self.count = 0
+        self.failed = False
+        self.arrays = {}
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._open("frames", np.int64, ())
+        self._open("hashes", np.uint64, ())
+
+    def _temp_path(self, name):
+        return _cache_path(self.key, name, self.cache_dir) + ".tmp"
+
+    def _open(self, name, dtype, item_shape):
+        self.arrays[name] = np.lib.format.open_memmap(self._temp_path(name), mode="w+", dtype=dtype,
+                                                      shape=(self.capacity,) + item_shape)
+
+    def append(self, frame_num, frame_hash, thumbnail=None):
+        """追加一个采样帧的指纹"""
+        if self.failed:
+            return
+        if self.count >= self.capacity:
+            # 超出预分配容量，放弃本次缓存
+            self.abort()
+            return
+
+        if thumbnail is not None and "thumbs" not in self.arrays:
+            # 预分配的大小超过缓存总上限时不缓存
+            if self.capacity * (16 + thumbnail.size) > self.max_bytes:
+                self.abort()
+                return
+            self._open("thumbs", np.uint8, thumbnail.shape)
+
+        self.arrays["frames"][self.count] = frame_num
+        self.arrays["hashes"][self.count] = frame_hash
+        if thumbnail is not None:
+            self.arrays["thumbs"][self.count] = thumbnail
+        self.count += 1
+
+    def commit(self):
+        """写入元数据并将临时文件替换为正式缓存文件"""
+        if self.failed:
+            return
+        for array in self.arrays.values():
+            array.flush()
+        self.arrays.clear()
+
+        try:
+            # 先删除旧的元数据，替换过程中缓存视为无效
+            if os.path.exists(_meta_path(self.key, self.cache_dir)):
+                os.remove(_meta_path(self.key, self.cache_dir))
+            for name in _ARRAY_NAMES:
+                if os.path.exists(self._temp_path(name)):
+                    os.replace(self._temp_path(name), _cache_path(self.key, name, self.cache_dir))
+
+            # 元数据最后写入，存在元数据即表示缓存完整
+            with open(_meta_path(self.key, self.cache_dir), "w", encoding="utf-8") as f:
+                json.dump({"version": CACHE_VERSION, "count": self.count}, f)
+        except OSError:
+            self.abort()
+            return
+
+        enforce_size_limit(self.cache_dir, self.max_bytes, keep=(self.key,))
+
+    def abort(self):
+        """放弃写入并删除临时文件"""
+        self.failed = True
+        self.arrays.clear()
+        for name in _ARRAY_NAMES:
+            try:
+                os.remove(self._temp_path(name))
+            except OSError:
+                pass
+
+
+def _cache_entries(cache_dir):
+    """按缓存键汇总缓存文件: {键: (总字节数, 最近使用时间, 文件路径列表)}，忽略正在写入的临时文件"""
+    try:
+        names = os.listdir(cache_dir)
+    except OSError:
+        return {}
+
+    files = {}
+    for name in names:
+        if name.endswith(".tmp"):
+            continue
+        path = os.path.join(cache_dir, name)
+        try:
+            files.setdefault(name.split(".", 1)[0], []).append((path, os.stat(path)))
+        except OSError:
+            continue
+
+    entries = {}
+    for key, key_files in files.items():
+        # 有元数据时以元数据的修改时间为最近使用时间，否则取最新的文件
+        meta_times = [stat.st_mtime for path, stat in key_files if path.endswith(".json")]
+        used = meta_times[0] if meta_times else max(stat.st_mtime for _, stat in key_files)
+        entries[key] = (sum(stat.st_size for _, stat in key_files), used, [path for path, _ in key_files])
+    return entries
+
+
+def enforce_size_limit(cache_dir=None, max_bytes=None, keep=()):
+    """缓存总大小超过max_bytes时，按最近使用时间从旧到新删除整个视频的缓存 (keep中的键除外)"""
+    cache_dir = cache_dir or FINGERPRINT_CACHE["dir"]
+    max_bytes = FINGERPRINT_CACHE["max_bytes"] if max_bytes is None else max_bytes
+    entries = _cache_entries(cache_dir)
+    total = sum(size for size, _, _ in entries.values())
+
+    for key, (size, _, paths) in sorted(entries.items(), key=lambda item: item[1][1]):
+        if total <= max_bytes:
+            break
+        if key in keep:
+            continue
+        # 先删除元数据，删除过程中缓存视为无效
+        for path in sorted(paths, key=lambda path: not path.endswith(".json")):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        total -= size
+
+
+def clear_cache(cache_dir=None):
+    """删除所有指纹缓存"""
+    enforce_size_limit(cache_dir, 0)
@@ -0,0 +1,77 @@
+"""指纹来源模块
+
+三个分析功能统一从这里获取采样帧指纹: 优先读取磁盘缓存，
+没有缓存时用单进程流水线顺序解码或多进程分段解码，并在完整扫描后写入缓存。
+"""
+import cv2
+
+from config.constants import FINGERPRINT_CACHE
+from utils.fingerprint import iter_video_fingerprints
+from utils.fingerprint_cache import load_fingerprints, FingerprintCacheWriter
+from utils.sharding import iter_sharded_fingerprints
+
+
+def _iter_decoded_fingerprints(video_path, frame_skip, total_frames, thumb_width, progress_callback, processes):
+    """解码视频计算指纹"""
+    if processes > 1:
+        yield from iter_sharded_fingerprints(video_path, frame_skip, total_frames, processes,
+                                             thumb_width, progress_callback)
+        return
+
+    cap = cv2.VideoCapture(video_path)
+    try:
+        if not cap.isOpened():
+            raise Exception("无法打开视频文件")
+        yield from iter_video_fingerprints(cap, frame_skip, thumb_width, progress_callback)
+    finally:
+        cap.release()
+
+
+def iter_fingerprints(video_path, frame_skip, total_frames, thumb_width=None,
+                      progress_callback=None, processes=1, use_cache=None):
+    """按帧号顺序逐个返回 (帧号, 打包哈希, 缩略图或None)
+
+    有缓存时直接从内存映射的缓存文件读取；否则processes大于1时按时间分段、多进程解码，
+    其余情况在单个VideoCapture上顺序解码。
+    """
+    if use_cache is None:
+        use_cache = FINGERPRINT_CACHE["enabled"]
+    # 较大的分析缩略图 (如循环检测的480像素灰度帧) 不缓存，只缓存哈希和紧凑的缩略图
+    if thumb_width and thumb_width > FINGERPRINT_CACHE["max_thumb_width"]:
+        use_cache = False
+
+    if use_cache:
+        cached = load_fingerprints(video_path, frame_skip, thumb_width)
+        if cached is not None:
+            for idx in range(len(cached)):
+                thumbnail = None if cached.thumbnails is None else cached.thumbnails[idx]
+                yield int(cached.frame_numbers[idx]), int(cached.hashes[idx]), thumbnail
+            if progress_callback:
+                progress_callback(total_frames)
+            return
+
+    samples = _iter_decoded_fingerprints(video_path, frame_skip, total_frames, thumb_width,
+                                         progress_callback, processes)
+    if not use_cache:
+        yield from samples
+        return
+
+    try:
+        writer = FingerprintCacheWriter(video_path, frame_skip, total_frames // max(1, frame_skip) + 1,
+                                        thumb_width)
+    except OSError:
+        yield from samples
+        return
+
+    completed = False
+    try:
+        for frame_num, frame_hash, thumbnail in samples:
+            writer.append(frame_num, frame_hash, thumbnail)
+            yield frame_num, frame_hash, thumbnail
+        completed = True
+    finally:
+        # 只有完整扫描的结果才写入缓存
+        if completed:
+            writer.commit()
+        else:
+            writer.abort()
@@ -0,0 +1,111 @@
+"""批量帧导出模块
+
+把一组帧号排序去重后顺序解码一遍: 不需要的帧只grab不解码，与下一个目标帧相距较远时直接定位。
+解码出的帧交给线程池调用cv2.imwrite编码写盘 (编码时释放GIL)，在途帧数受限以控制内存。
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+
+from config.constants import FRAME_EXPORT_DEFAULTS, PIPELINE_DEFAULTS
+from utils.sampler import seek_to_frame
+from utils.segment_export import ExportJob
+
+
+def imwrite_params(image_format, jpeg_quality=None, png_compression=None):
+    """生成cv2.imwrite的编码参数"""
+    if image_format == "png":
+        level = FRAME_EXPORT_DEFAULTS["png_compression"] if png_compression is None else png_compression
+        return [cv2.IMWRITE_PNG_COMPRESSION, int(level)]
+    quality = FRAME_EXPORT_DEFAULTS["jpeg_quality"] if jpeg_quality is None else jpeg_quality
+    return [cv2.IMWRITE_JPEG_QUALITY, int(quality)]
+
+
+def frame_file_name(frame_num, image_format):
+    return f"frame_{frame_num:06d}.{image_format}"
+
+
+def _write_image(path, frame, params):
+    if not cv2.imwrite(path, frame, params):
+        raise Exception(f"无法写入图片: {path}")
+
+
+class FrameExportJob(ExportJob):
+    """后台把指定帧导出为图片文件"""
+
+    def __init__(self, video_path, frame_numbers, output_dir, image_format="jpg", jpeg_quality=None,
+                 png_compression=None, max_workers=None, max_gap_frames=300, **kwargs):
+        super().__init__(video_path, None, **kwargs)
+        self.frame_numbers = sorted({int(frame) for frame in frame_numbers if frame >= 0})
+        self.output_dir = output_dir
+        self.image_format = image_format
+        self.params = imwrite_params(image_format, jpeg_quality, png_compression)
+        self.max_workers = max_workers or PIPELINE_DEFAULTS["max_workers"]
+        self.max_gap_frames = max_gap_frames
+
+        self.total = len(self.frame_numbers)
+        self.completed = 0
+        # 无法读取 (超出视频范围或解码失败) 而未能导出的帧号
+        self.missing = []
+
+    def _run(self):
+        status, error = "done", None
+        cap = cv2.VideoCapture(self.video_path)
+        try:
+            if not cap.isOpened():
+                raise Exception("无法打开源视频")
+            os.makedirs(self.output_dir, exist_ok=True)
+
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                pending = []
+                position = None
+                for index, frame_num in enumerate(self.frame_numbers):
+                    if self.cancel_event.is_set():
+                        break
+
+                    # 相距较远时定位，否则顺序grab跳过中间的帧；读不到时之后的帧也都超出视频范围
+                    if position is None or frame_num - position > self.max_gap_frames:
+                        if not seek_to_frame(cap, frame_num):
+                            self.missing.extend(self.frame_numbers[index:])
+                            break
+                        position = frame_num
+                    while position < frame_num and cap.grab():
+                        position += 1
+                    if position < frame_num or not cap.grab():
+                        self.missing.extend(self.frame_numbers[index:])
+                        break
+                    position += 1
+                    ret, frame = cap.retrieve()
+                    if not ret:
+                        self.missing.append(frame_num)
+                        continue
+
+                    path = os.path.join(self.output_dir, frame_file_name(frame_num, self.image_format))
+                    pending.append(executor.submit(_write_image, path, frame, self.params))
+
+                    # 限制在途帧数，等待最早提交的写入完成
+                    while len(pending) >= self.queue_size:
+                        pending.pop(0).result()
+                        self.completed += 1
+                        self._report(self.completed, self.total)
+
+                for future in pending:
+                    future.result()
+                    self.completed += 1
+                    self._report(self.completed, self.total)
+
+            if self.cancel_event.is_set():
+                status = "cancelled"
+            else:
+                if self.progress_callback:
+                    self.progress_callback(self.completed, self.total)
+                if self.missing:
+                    status, error = "partial", f"{len(self.missing)} 帧无法读取 (超出视频范围或解码失败)，未能导出"
+        except Exception as e:
+            status, error = "error", str(e)
+        finally:
+            cap.release()
+
+        if self.done_callback:
+            self.done_callback(status, error)
@@ -0,0 +1,64 @@
+"""环形帧缓存模块
+
+循环检测只需要保留搜索范围内的最近若干采样帧。缓存按固定容量一次性分配连续数组
+(容量, h, w)，帧号单独存一个并行数组 (-1表示空槽)，插入和淘汰都是O(1)，
+批量比较可以直接按槽位索引读取各特征数组。
+"""
+import numpy as np
+
+
+class FrameRingBuffer:
+    """固定容量的环形缓存，按插入顺序 (即帧号顺序) 保存每帧的特征"""
+
+    def __init__(self, capacity):
+        self.capacity = max(1, int(capacity))
+        self.frame_numbers = np.full(self.capacity, -1, dtype=np.int64)
+        self.arrays = {}
+        self.start = 0
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def _allocate(self, features):
+        """按第一帧特征的形状和类型分配各特征数组"""
+        for name, value in features.items():
+            value = np.asarray(value)
+            self.arrays[name] = np.empty((self.capacity,) + value.shape, dtype=value.dtype)
+
+    def push(self, frame_num, features):
+        """写入一帧，缓存已满时覆盖最旧的帧，返回写入的槽位"""
+        if not self.arrays:
+            self._allocate(features)
+
+        if self.count < self.capacity:
+            slot = (self.start + self.count) % self.capacity
+            self.count += 1
+        else:
+            slot = self.start
+            self.start = (self.start + 1) % self.capacity
+
+        self.frame_numbers[slot] = frame_num
+        for name, value in features.items():
+            self.arrays[name][slot] = value
+        return slot
+
+    def discard_oldest(self):
+        """淘汰最旧的一帧"""
+        if self.count:
+            self.frame_numbers[self.start] = -1
+            self.start = (self.start + 1) % self.capacity
+            self.count -= 1
+
+    def evict_before(self, frame_num):
+        """淘汰帧号小于frame_num的帧"""
+        while self.count and self.frame_numbers[self.start] < frame_num:
+            self.discard_oldest()
+
+    def slots(self):
+        """按从旧到新的顺序返回有效槽位"""
+        return (self.start + np.arange(self.count)) % self.capacity
+
+    def lookup(self, name, slots):
+        """读取指定槽位的特征"""
+        return self.arrays[name][slots]
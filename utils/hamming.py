@@ -0,0 +1,62 @@
+"""向量化汉明距离计算模块
+
+在打包为uint64的哈希上使用 XOR + popcount 分块计算距离矩阵，并批量应用阈值。
+"""
+import numpy as np
+
+
+# 每个分块最多包含的距离矩阵元素数量，用于限制内存占用
+DEFAULT_BLOCK_ELEMENTS = 4 * 1024 * 1024
+
+# 字节popcount查找表 (旧版numpy没有bitwise_count时使用)
+_BYTE_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def popcount64(values):
+    """计算uint64数组每个元素中1的个数"""
+    values = np.ascontiguousarray(values, dtype=np.uint64)
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(values)
+    as_bytes = values.view(np.uint8).reshape(values.shape + (8,))
+    return _BYTE_POPCOUNT[as_bytes].sum(axis=-1, dtype=np.uint8)
+
+
+def hamming_distance_matrix(hashes_a, hashes_b):
+    """计算两组哈希之间的汉明距离矩阵"""
+    hashes_a = np.asarray(hashes_a, dtype=np.uint64)
+    hashes_b = np.asarray(hashes_b, dtype=np.uint64)
+    return popcount64(hashes_a[:, None] ^ hashes_b[None, :])
+
+
+def similarity_mask_table(threshold, hash_bits):
+    """生成按距离索引的阈值判断表，与逐对比较 similarity > (1 - threshold) 完全一致"""
+    distances = np.arange(hash_bits + 1)
+    similarities = 1 - (distances / hash_bits)
+    return similarities > (1 - threshold)
+
+
+def max_accepted_distance(threshold, hash_bits):
+    """满足阈值的最大汉明距离 (没有满足的距离时返回-1)"""
+    return int(np.count_nonzero(similarity_mask_table(threshold, hash_bits))) - 1
+
+
+def iter_similar_blocks(hashes, threshold, hash_bits, block_elements=DEFAULT_BLOCK_ELEMENTS):
+    """分块计算上三角距离矩阵，逐块返回 (已完成行数, 满足阈值的下标i数组, 下标j数组, 距离数组)"""
+    hashes = np.asarray(hashes, dtype=np.uint64)
+    total = len(hashes)
+    max_distance = max_accepted_distance(threshold, hash_bits)
+
+    start = 0
+    while start < total:
+        rows = max(1, min(total - start, block_elements // max(1, total - start)))
+        stop = start + rows
+
+        # 只计算 j >= start 的部分，对角块内再去掉 j <= i
+        distances = hamming_distance_matrix(hashes[start:stop], hashes[start:])
+        mask = distances <= max_distance
+        mask[:, :rows] &= np.triu(np.ones((rows, rows), dtype=bool), k=1)
+
+        rows_idx, cols_idx = np.nonzero(mask)
+        yield stop, rows_idx + start, cols_idx + start, distances[rows_idx, cols_idx]
+
+        start = stop
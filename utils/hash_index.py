@@ -0,0 +1,145 @@
+"""汉明空间索引模块
+
+使用多索引哈希 (Multi-Index Hashing) 组织打包哈希: 把64位哈希切成约 64/log2(n) 段，
+每段的桶内平均只有约一帧。根据鸽巢原理，距离不超过 r 的两个哈希至少有一段的距离不超过 ⌊r/m⌋，
+因此只需在每段上枚举不超过 ⌊r/m⌋ 位的翻转，对排好序的段值整体二分查找得到候选桶对，
+再把桶对展开为帧对并计算完整距离。查询半径较大时枚举的翻转数急剧增加，此时应改用分块矩阵。
+"""
+import itertools
+from math import comb
+
+import numpy as np
+
+from utils.hamming import popcount64
+
+
+# 每块最多展开的候选帧对数量，用于限制内存占用
+DEFAULT_BLOCK_PAIRS = 4 * 1024 * 1024
+
+# 每次翻转探测 (一次整列二分查找) 相对于距离矩阵中一个元素的大致耗时
+PROBE_COST = 16
+
+
+def substring_count(count, max_distance, hash_bits=64):
+    """按帧数选择段数 m ≈ hash_bits / log2(n)，不超过 max_distance + 1"""
+    if count < 2:
+        return 1
+    return int(max(1, min(hash_bits, max_distance + 1, round(hash_bits / np.log2(count)))))
+
+
+def probe_count(width, radius):
+    """宽度为width的段上汉明重量不超过radius的翻转数量"""
+    return sum(comb(width, weight) for weight in range(min(radius, width) + 1))
+
+
+def index_is_faster(count, max_distance, hash_bits=64):
+    """估计多索引哈希的探测量是否少于分块矩阵需要计算的距离数量"""
+    if max_distance < 0 or count < 2:
+        return True
+    substrings = substring_count(count, max_distance, hash_bits)
+    width = -(-hash_bits // substrings)
+    probes = substrings * probe_count(width, max_distance // substrings) * count
+    return probes * PROBE_COST < count * count // 2
+
+
+def flip_masks(width, radius):
+    """宽度为width的段上所有汉明重量不超过radius的翻转掩码"""
+    masks = [0]
+    for weight in range(1, min(radius, width) + 1):
+        for bits in itertools.combinations(range(width), weight):
+            masks.append(sum(1 << bit for bit in bits))
+    return np.array(masks, dtype=np.uint64)
+
+
+class MultiIndexHash:
+    """面向固定查询半径的多索引哈希表"""
+
+    def __init__(self, hashes, max_distance, hash_bits=64):
+        self.hashes = np.ascontiguousarray(hashes, dtype=np.uint64)
+        self.max_distance = max_distance
+
+        substrings = substring_count(len(self.hashes), max_distance, hash_bits)
+        bounds = np.linspace(0, hash_bits, substrings + 1).astype(int)
+        self.radius = max_distance // substrings
+
+        # 每段: (偏移, 掩码, 宽度, 升序的不同段值, 各段值的起始位置, 成员数, 按段值排序的帧下标)
+        self.tables = []
+        for low, high in zip(bounds[:-1], bounds[1:]):
+            shift = np.uint64(low)
+            mask = np.uint64((1 << int(high - low)) - 1)
+            keys = (self.hashes >> shift) & mask
+            order = np.argsort(keys, kind="stable")
+            unique_keys, starts, counts = np.unique(keys[order], return_index=True, return_counts=True)
+            self.tables.append((shift, mask, int(high - low), unique_keys, starts, counts, order))
+
+    def __len__(self):
+        return len(self.hashes)
+
+    def bucket_pairs(self, table):
+        """一段上段距离不超过radius的桶对 (a <= b)"""
+        _, _, width, unique_keys, _, counts, _ = table
+        firsts, seconds = [], []
+        for flip in flip_masks(width, self.radius):
+            if flip == 0:
+                # 同一桶内的帧两两组合
+                same = np.flatnonzero(counts >= 2)
+                firsts.append(same)
+                seconds.append(same)
+                continue
+            targets = unique_keys ^ flip
+            positions = np.minimum(np.searchsorted(unique_keys, targets), len(unique_keys) - 1)
+            hit = np.flatnonzero((unique_keys[positions] == targets) & (np.arange(len(unique_keys)) < positions))
+            firsts.append(hit)
+            seconds.append(positions[hit])
+        return np.concatenate(firsts), np.concatenate(seconds)
+
+    def expand(self, table, firsts, seconds, block_pairs):
+        """把桶对展开为帧对，按展开数量分块返回 (下标数组, 下标数组, 是否同桶)"""
+        _, _, _, _, starts, counts, order = table
+        sizes = counts[firsts] * counts[seconds]
+        ends = np.cumsum(sizes)
+        total = int(ends[-1]) if len(ends) else 0
+
+        for low in range(0, total, block_pairs):
+            flat = np.arange(low, min(total, low + block_pairs), dtype=np.int64)
+            pair = np.searchsorted(ends, flat, side="right")
+            offset = flat - (ends[pair] - sizes[pair])
+            second_counts = counts[seconds[pair]]
+            yield (order[starts[firsts[pair]] + offset // second_counts],
+                   order[starts[seconds[pair]] + offset % second_counts],
+                   firsts[pair] == seconds[pair])
+
+    def iter_pairs(self, block_pairs=DEFAULT_BLOCK_PAIRS):
+        """逐块返回 (已完成比例, 下标i数组, 下标j数组, 距离数组)，每个 i < j 的帧对只返回一次"""
+        joins = [(table, self.bucket_pairs(table)) for table in self.tables]
+        total = sum(int((table[5][firsts] * table[5][seconds]).sum()) for table, (firsts, seconds) in joins)
+        done = 0
+
+        for index, (table, (firsts, seconds)) in enumerate(joins):
+            for first, second, same_bucket in self.expand(table, firsts, seconds, block_pairs):
+                done += len(first)
+                # 同一桶内的组合包含 (i, j) 和 (j, i)，只保留 i < j
+                keep = (first < second) | ~same_bucket
+                rows, cols = np.minimum(first, second)[keep], np.maximum(first, second)[keep]
+
+                differences = self.hashes[rows] ^ self.hashes[cols]
+                distances = popcount64(differences)
+                keep = distances <= self.max_distance
+                # 只在第一个满足段距离条件的段上保留，避免同一帧对重复返回
+                for shift, mask, _, _, _, _, _ in self.tables[:index]:
+                    keep &= popcount64((differences >> shift) & mask) > self.radius
+                yield done / max(1, total), rows[keep], cols[keep], distances[keep]
+
+
+def iter_index_blocks(hashes, max_distance, block_pairs=DEFAULT_BLOCK_PAIRS):
+    """用多索引哈希查找所有 i < j 且距离不超过max_distance的帧对，按块返回 (已完成行数, 下标i数组, 下标j数组, 距离数组)
+
+    多索引哈希不按行处理，已完成行数按已展开的候选比例折算。
+    """
+    if max_distance < 0:
+        return
+
+    index = MultiIndexHash(hashes, max_distance)
+    total = len(index)
+    for fraction, rows, cols, distances in index.iter_pairs(block_pairs):
+        yield max(1, int(fraction * total)), rows, cols, distances
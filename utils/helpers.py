@@ -1,5 +1,6 @@
 import cv2
 import imagehash
+import numpy as np
 from PIL import Image
 from datetime import timedelta
 
@@ -10,33 +11,25 @@ def frame_to_time(frame_num, fps):
     return str(timedelta(seconds=seconds)).split('.')[0]
 
 
+def frames_to_times(frame_numbers, fps):
+    """批量将帧号转换为时间字符串，结果与frame_to_time一致 (一天以内)"""
+    # timedelta按微秒取整后再截去小数部分
+    seconds = np.floor(np.round(np.asarray(frame_numbers) / fps, 6)).astype(np.int64)
+    hours = (seconds // 3600).astype(str)
+    minutes = np.char.zfill((seconds // 60 % 60).astype(str), 2)
+    secs = np.char.zfill((seconds % 60).astype(str), 2)
+    return np.char.add(np.char.add(np.char.add(np.char.add(hours, ":"), minutes), ":"), secs)
+
+
 def calculate_frame_hash(frame):
     """计算帧的哈希值"""
     img = Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
     return imagehash.average_hash(img)
 
 
-def sort_treeview(tree, col, reverse):
-    """排序结果列表"""
-    # 检查tree是否有效
-    if not tree or not hasattr(tree, 'get_children'):
-        return
-
-    data = []
-    for child in tree.get_children():
-        values = tree.item(child, 'values')
-        if col == "similarity" and values and len(values) > tree["columns"].index(col):
-            try:
-                data.append((float(values[tree["columns"].index(col)]), child))
-            except (ValueError, IndexError):
-                data.append((0.0, child))
-        elif values and len(values) > tree["columns"].index(col):
-            data.append((values[tree["columns"].index(col)], child))
-
-    data.sort(reverse=reverse)
-
-    for idx, (val, child) in enumerate(data):
-        tree.move(child, '', idx)
-
-    # 切换排序方向
-    tree.heading(col, command=lambda: sort_treeview(tree, col, not reverse))
\ No newline at end of file
+def sort_rows(rows, keys, reverse=False):
+    """按键值稳定排序行下标，倒序时键值相同的行仍保持原来的先后顺序"""
+    if reverse:
+        rows, keys = rows[::-1], keys[::-1]
+    rows = rows[np.argsort(keys, kind="stable")]
+    return rows[::-1] if reverse else rows
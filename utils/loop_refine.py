@@ -0,0 +1,95 @@
+"""循环点精修模块
+
+粗扫描按采样间隔得到的循环起止帧最多偏差一个采样间隔。精修时只解码每个候选
+起止帧附近的小窗口 (每个窗口定位一次后顺序读取)，先在低分辨率下逐帧计算
+起点窗口 x 终点窗口的SSIM网格，再以分析宽度复核得分最高的几个组合，得到逐帧精确的循环点。
+"""
+import cv2
+import numpy as np
+
+from utils.fingerprint import make_thumbnail
+from utils.ssim import frame_stats, ssim_batch
+
+
+def read_window(cap, first, last, width):
+    """从first定位一次后顺序读取到last (含)，返回 (帧号列表, 灰度图列表)"""
+    cap.set(cv2.CAP_PROP_POS_FRAMES, first)
+    frame_numbers, grays = [], []
+    for frame_num in range(first, last + 1):
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frame_numbers.append(frame_num)
+        grays.append(make_thumbnail(frame, width))
+    return frame_numbers, grays
+
+
+def _stack_with_stats(grays):
+    stats = [frame_stats(gray) for gray in grays]
+    return (np.stack(grays), np.stack([mean for mean, _ in stats]),
+            np.stack([variance for _, variance in stats]))
+
+
+def _downscale(gray, width):
+    h, w = gray.shape[:2]
+    if w <= width:
+        return gray
+    return cv2.resize(gray, (width, max(1, int(h * width / w))), interpolation=cv2.INTER_AREA)
+
+
+def _ranked_cells(grid, rows, cols, row_frames, col_frames, start, end):
+    """按SSIM从高到低排列网格单元，分数相同时优先离粗扫描结果近的，结束帧不晚于起始帧的单元被排除"""
+    row_frames = np.asarray(row_frames)[rows]
+    col_frames = np.asarray(col_frames)[cols]
+    grid = np.where(col_frames[None, :] > row_frames[:, None], grid, -np.inf)
+    displacement = np.abs(row_frames - start)[:, None] + np.abs(col_frames - end)[None, :]
+    order = np.lexsort((displacement.ravel(), -grid.ravel()))
+    return [(rows[flat // len(cols)], cols[flat % len(cols)]) for flat in order.tolist()
+            if np.isfinite(grid.flat[flat])]
+
+
+def refine_loop(cap, start, end, radius, width, search_width=160, total_frames=None, verify_count=3):
+    """在 start±radius 和 end±radius 内寻找SSIM最高的 (起始帧, 结束帧)，返回 (起始帧, 结束帧, SSIM)
+
+    先按步长在低分辨率下粗搜网格，再在最佳单元附近逐帧细搜，最后以分析宽度复核。
+    无法读取窗口时返回None。结束帧始终在起始帧之后。
+    """
+    last_frame = None if not total_frames else total_frames - 1
+
+    def bounds(center):
+        first = max(0, center - radius)
+        last = center + radius if last_frame is None else min(last_frame, center + radius)
+        return first, last
+
+    start_frames, start_grays = read_window(cap, *bounds(start), width)
+    end_frames, end_grays = read_window(cap, *bounds(end), width)
+    if not start_frames or not end_frames:
+        return None
+
+    small_start = [_downscale(gray, search_width) for gray in start_grays]
+    small_end, end_means, end_variances = _stack_with_stats([_downscale(gray, search_width) for gray in end_grays])
+
+    def search(rows, cols):
+        grid = np.vstack([ssim_batch(small_start[i], small_end[cols], end_means[cols], end_variances[cols])
+                          for i in rows])
+        return _ranked_cells(grid, rows, cols, start_frames, end_frames, start, end)
+
+    # 粗搜: 步长约为窗口长度的平方根
+    step = max(1, int(np.sqrt(max(len(start_frames), len(end_frames)))))
+    coarse = search(np.arange(0, len(start_frames), step), np.arange(0, len(end_frames), step))
+    if not coarse:
+        return None
+
+    # 细搜: 在粗搜最佳单元的一个步长范围内逐帧搜索
+    i, j = coarse[0]
+    fine = search(np.arange(max(0, i - step + 1), min(len(start_frames), i + step)),
+                  np.arange(max(0, j - step + 1), min(len(end_frames), j + step)))
+
+    # 以分析宽度复核得分最高的几个组合
+    best = None
+    for i, j in fine[:verify_count]:
+        mean, variance = frame_stats(end_grays[j])
+        score = float(ssim_batch(start_grays[i], end_grays[j][None], mean[None], variance[None])[0])
+        if best is None or score > best[2]:
+            best = (start_frames[i], end_frames[j], score)
+    return best
@@ -0,0 +1,85 @@
+"""解码流水线模块
+
+解码线程把采样帧放入有界队列，线程池并行执行比较前的计算 (颜色转换、哈希等)，
+结果按输入顺序交还给调用方。cv2的大部分函数会释放GIL，多个核心可以同时工作。
+"""
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from config.constants import PIPELINE_DEFAULTS
+
+
+# 队列结束标记
+_END = object()
+
+
+class _SourceError:
+    """包装解码线程中抛出的异常，交给消费方重新抛出"""
+
+    def __init__(self, error):
+        self.error = error
+
+
+class FramePipeline:
+    """解码线程 -> 有界队列 -> 线程池 -> 按顺序收集结果"""
+
+    def __init__(self, worker, max_workers=None, queue_size=None):
+        self.worker = worker
+        self.max_workers = max_workers or PIPELINE_DEFAULTS["max_workers"]
+        self.queue_size = queue_size or PIPELINE_DEFAULTS["queue_size"]
+
+    def _produce(self, source, items, stop_event):
+        """解码线程: 遍历source并放入有界队列"""
+        try:
+            for item in source:
+                while not stop_event.is_set():
+                    try:
+                        items.put(item, timeout=0.1)
+                        break
+                    except queue.Full:
+                        continue
+                if stop_event.is_set():
+                    return
+        except Exception as e:
+            items.put(_SourceError(e))
+            return
+        items.put(_END)
+
+    def run(self, source):
+        """在流水线中处理source的每一项，按输入顺序返回worker的结果"""
+        items = queue.Queue(maxsize=self.queue_size)
+        stop_event = threading.Event()
+        producer = threading.Thread(target=self._produce, args=(source, items, stop_event), daemon=True)
+        executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        pending = deque()
+
+        producer.start()
+        try:
+            while True:
+                item = items.get()
+                if item is _END:
+                    break
+                if isinstance(item, _SourceError):
+                    raise item.error
+
+                pending.append(executor.submit(self.worker, item))
+
+                # 限制在途任务数量，按顺序交还已完成的结果
+                while len(pending) >= self.max_workers * 2:
+                    yield pending.popleft().result()
+
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            stop_event.set()
+            # 清空队列，让阻塞中的解码线程能够退出
+            while producer.is_alive():
+                try:
+                    items.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+            for future in pending:
+                future.cancel()
+            executor.shutdown(wait=True)
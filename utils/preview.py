@@ -0,0 +1,116 @@
+"""帧预览服务模块
+
+每个视频保持一个常驻的VideoCapture (加锁访问)，解码并缩放好的预览图按LRU缓存。
+请求的帧正好是上一次读取的下一帧时直接顺序读取，不再定位。
+后台线程预取结果列表中相邻行的帧，方向键浏览结果时可以直接命中缓存。
+"""
+import threading
+from collections import OrderedDict
+
+import cv2
+from PIL import Image
+
+from config.constants import PREVIEW_DEFAULTS
+
+
+def fit_size(width, height, max_width, max_height):
+    """按比例缩放到不超过 (max_width, max_height)"""
+    scale = min(max_width / width, max_height / height)
+    return max(1, int(width * scale)), max(1, int(height * scale))
+
+
+class FramePreviewService:
+    """单个视频的预览图服务，get() 返回缩放后的PIL图像"""
+
+    def __init__(self, video_path, cache_size=None):
+        self.video_path = video_path
+        self.cache_size = cache_size or PREVIEW_DEFAULTS["cache_size"]
+        self.cache = OrderedDict()
+        self.lock = threading.Lock()
+        self.cap = None
+        # 常驻capture下一次read()将读到的帧号
+        self.position = None
+
+        self._pending = []
+        self._pending_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+        self._thread = None
+
+    def _read(self, frame_num):
+        """读取原始帧，调用方需持有锁"""
+        if self.cap is None:
+            self.cap = cv2.VideoCapture(self.video_path)
+            self.position = 0
+        if not self.cap.isOpened():
+            return None
+
+        if self.position != frame_num:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, frame_num)
+        ret, frame = self.cap.read()
+        self.position = frame_num + 1 if ret else None
+        return frame if ret else None
+
+    def get(self, frame_num, size):
+        """返回缩放到不超过size (宽, 高) 的预览图，读取失败时返回None"""
+        key = (frame_num, size)
+        with self.lock:
+            if self._closed:
+                return None
+            image = self.cache.get(key)
+            if image is not None:
+                self.cache.move_to_end(key)
+                return image
+
+            frame = self._read(frame_num)
+            if frame is None:
+                return None
+
+            h, w = frame.shape[:2]
+            frame = cv2.resize(frame, fit_size(w, h, *size))
+            image = Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+
+            self.cache[key] = image
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+            return image
+
+    def prefetch(self, requests):
+        """在后台预取 [(帧号, size), ...]，新的请求会替换尚未处理的旧请求"""
+        with self._pending_lock:
+            self._pending = list(requests)
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._prefetch_loop, daemon=True)
+            self._thread.start()
+        self._wake.set()
+
+    def _prefetch_loop(self):
+        while not self._closed:
+            self._wake.wait()
+            self._wake.clear()
+            while not self._closed:
+                with self._pending_lock:
+                    if not self._pending:
+                        break
+                    frame_num, size = self._pending.pop(0)
+                self.get(frame_num, size)
+
+    def close(self):
+        """释放capture并停止预取"""
+        self._closed = True
+        self._wake.set()
+        with self.lock:
+            if self.cap is not None:
+                self.cap.release()
+                self.cap = None
+            self.cache.clear()
+
+
+def container_size(container, default_size):
+    """容器当前尺寸，尚未布局时使用默认尺寸"""
+    width = max(1, container.winfo_width())
+    height = max(1, container.winfo_height())
+    if width < 10 or height < 10:
+        return default_size
+    return width, height
+
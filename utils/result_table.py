@@ -0,0 +1,160 @@
+"""结果表模块
+
+各标签页的结果以NumPy结构化数组保存 (每行一条结果，时间列在显示时由帧号换算)，
+生成、排序和筛选都按列整体计算，不需要为每条结果创建Python对象。
+搜索框支持帧号、时间和相似度范围查询，其余输入按子串匹配。
+"""
+import numpy as np
+
+from utils.helpers import frames_to_times
+
+# 相似帧: 两帧的帧号和相似度
+SIMILAR_PAIR_DTYPE = np.dtype([("frame1", np.int64), ("frame2", np.int64), ("similarity", np.float64)])
+
+# 相似帧分组: 组内最早的帧 (代表帧)、最晚的帧和成员数
+CLUSTER_DTYPE = np.dtype([("frame1", np.int64), ("frame2", np.int64), ("count", np.int64)])
+
+# 首帧相似: 帧号和与第一帧的相似度
+FIRST_FRAME_DTYPE = np.dtype([("frame", np.int64), ("similarity", np.float64)])
+
+# 循环片段: 起止帧号和SSIM值
+LOOP_DTYPE = np.dtype([("start_frame", np.int64), ("end_frame", np.int64), ("ssim_value", np.float64)])
+
+
+def make_table(dtype, **columns):
+    """由各列数组构造结构化数组，列名与dtype字段对应"""
+    length = len(next(iter(columns.values()))) if columns else 0
+    table = np.empty(length, dtype=dtype)
+    for name, values in columns.items():
+        table[name] = values
+    return table
+
+
+def _parse_value(text):
+    """解析查询中的一个值: 含冒号为时间 (返回秒数)，含小数点为相似度，纯数字为帧号"""
+    text = text.strip()
+    try:
+        if ":" in text:
+            seconds = 0
+            for part in text.split(":"):
+                seconds = seconds * 60 + int(part)
+            return "time", seconds
+        if "." in text:
+            return "score", float(text)
+        return "frame", int(text)
+    except ValueError:
+        return None, None
+
+
+def _bounds(kind, value, fps, side):
+    """把一个查询值换算为帧号或相似度的边界 (值, 是否包含)，side为"low"或"high"
+
+    时间按显示精度 (整秒) 比较: 显示为t的帧满足 t*fps <= 帧号 < (t+1)*fps。
+    """
+    if kind == "time":
+        return (value * fps, True) if side == "low" else ((value + 1) * fps, False)
+    return value, True
+
+
+def parse_query(text, fps):
+    """把搜索框文本解析为数值范围 (类型, 下界, 上界)，不是范围查询时返回None
+
+    支持 "100-200" (帧号)、"0:01:00-0:02:00" (时间)、"0.9-1.0" (相似度)
+    以及 ">0.9"、"<=0:01:30" 等单边范围，边界为 (值, 是否包含) 或None。
+    """
+    text = text.strip()
+    for operator in (">=", "<=", ">", "<"):
+        if text.startswith(operator):
+            kind, value = _parse_value(text[len(operator):])
+            if kind is None:
+                return None
+            # ">x" 即 "不满足<=x"，"<x" 即 "不满足>=x"
+            bound = _bounds(kind, value, fps, "low" if operator in (">=", "<") else "high")
+            if operator in (">", "<"):
+                bound = (bound[0], not bound[1])
+            field = "score" if kind == "score" else "frame"
+            return (field, bound, None) if operator.startswith(">") else (field, None, bound)
+
+    if "-" in text.strip("-"):
+        low_text, high_text = text.split("-", 1)
+        low_kind, low = _parse_value(low_text)
+        high_kind, high = _parse_value(high_text)
+        if low_kind is None or high_kind is None or (low_kind == "score") != (high_kind == "score"):
+            return None
+        field = "score" if low_kind == "score" else "frame"
+        return field, _bounds(low_kind, low, fps, "low"), _bounds(high_kind, high, fps, "high")
+    return None
+
+
+class ResultFilter:
+    """结果表的筛选索引
+
+    数值范围查询在按列排序的下标上二分查找；其余输入按子串匹配帧号和时间文本 (整列向量化比较)，
+    新输入包含上一次的输入时只在上一次的结果中继续筛选。
+    """
+
+    def __init__(self, table, fps, frame_fields, score_field):
+        self.table = table
+        self.fps = fps
+        self.frame_fields = frame_fields
+        self.score_field = score_field
+        self.sorted_rows = {}
+        self.text_columns = None
+        self.last_term = None
+        self.last_rows = None
+
+    def _sorted(self, field):
+        """按字段排序的行下标及对应的值 (首次使用时计算)"""
+        if field not in self.sorted_rows:
+            rows = np.argsort(self.table[field], kind="stable")
+            self.sorted_rows[field] = (rows, self.table[field][rows])
+        return self.sorted_rows[field]
+
+    def _range_rows(self, field, low, high):
+        rows, keys = self._sorted(field)
+        start, stop = 0, len(keys)
+        if low is not None:
+            start = np.searchsorted(keys, low[0], "left" if low[1] else "right")
+        if high is not None:
+            stop = np.searchsorted(keys, high[0], "right" if high[1] else "left")
+        return rows[start:max(start, stop)]
+
+    def _text_columns(self):
+        """每个帧号字段的帧号文本和时间文本"""
+        if self.text_columns is None:
+            self.text_columns = []
+            for field in self.frame_fields:
+                self.text_columns.append(self.table[field].astype(str))
+                self.text_columns.append(frames_to_times(self.table[field], self.fps))
+        return self.text_columns
+
+    def match(self, text):
+        """返回满足查询的行下标 (升序)，查询为空时返回None表示全部"""
+        term = text.strip().lower()
+        if not term:
+            self.last_term = self.last_rows = None
+            return None
+
+        query = parse_query(term, self.fps)
+        if query is not None:
+            self.last_term = self.last_rows = None
+            field, low, high = query
+            if field == "score":
+                return np.sort(self._range_rows(self.score_field, low, high))
+
+            # 任一帧号字段在范围内即匹配
+            matched = np.zeros(len(self.table), dtype=bool)
+            for name in self.frame_fields:
+                matched[self._range_rows(name, low, high)] = True
+            return np.flatnonzero(matched)
+
+        # 子串匹配，输入继续变长时只检查上一次匹配的行
+        if self.last_term is not None and self.last_term in term:
+            rows = self.last_rows
+        else:
+            rows = np.arange(len(self.table), dtype=np.int64)
+        matched = np.zeros(len(rows), dtype=bool)
+        for column in self._text_columns():
+            matched |= np.char.find(column[rows], term) >= 0
+        self.last_term, self.last_rows = term, rows[matched]
+        return self.last_rows
@@ -0,0 +1,51 @@
+"""顺序采样模块
+
+按采样间隔顺序读取视频: 跳过的帧只调用grab()不解码，采样帧才调用retrieve()，
+扫描过程中不做任何seek，避免长GOP视频上逐帧定位的巨大开销。
+"""
+import cv2
+
+
+def iter_sampled_frames(cap, frame_skip, start_frame=0, end_frame=None,
+                        progress_callback=None, progress_interval=50):
+    """从cap的当前位置顺序读取，返回帧号为frame_skip整数倍的 (帧号, 帧)
+
+    start_frame为cap当前位置对应的帧号，end_frame (不含) 为None时读到视频结束。
+    progress_callback每读取progress_interval帧调用一次，参数为已读取到的帧号。
+    """
+    frame_skip = max(1, frame_skip)
+    frame_count = start_frame
+
+    while cap.isOpened():
+        if end_frame is not None and frame_count >= end_frame:
+            break
+
+        if not cap.grab():
+            break
+
+        if frame_count % frame_skip == 0:
+            ret, frame = cap.retrieve()
+            if ret:
+                yield frame_count, frame
+
+        frame_count += 1
+
+        if progress_callback and frame_count % progress_interval == 0:
+            progress_callback(frame_count)
+
+
+def seek_to_frame(cap, frame_num):
+    """定位到指定帧，后端定位不准确时退回到从头顺序grab"""
+    frame_num = max(0, frame_num)
+    # 已在目标位置 (如新打开的视频定位到第0帧) 时不再定位
+    if int(cap.get(cv2.CAP_PROP_POS_FRAMES)) == frame_num:
+        return True
+    cap.set(cv2.CAP_PROP_POS_FRAMES, frame_num)
+    if int(cap.get(cv2.CAP_PROP_POS_FRAMES)) == frame_num:
+        return True
+
+    cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+    for _ in range(frame_num):
+        if not cap.grab():
+            return False
+    return True
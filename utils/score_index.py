@@ -0,0 +1,28 @@
+"""分数索引模块
+
+分析结束后保存所有候选结果的原始分数 (汉明距离或SSIM)，按分数排序存储。
+阈值变化时只需二分查找，即可在毫秒级得到满足新阈值的结果，无需重新分析。
+"""
+import numpy as np
+
+
+class ScoreIndex:
+    """按分数升序保存候选结果下标"""
+
+    def __init__(self, scores):
+        scores = np.asarray(scores)
+        self.order = np.argsort(scores, kind="stable")
+        self.sorted_scores = scores[self.order]
+
+    def __len__(self):
+        return len(self.order)
+
+    def select_at_most(self, limit):
+        """返回分数不超过limit的候选下标 (按原始顺序)"""
+        count = np.searchsorted(self.sorted_scores, limit, side="right")
+        return np.sort(self.order[:count])
+
+    def select_at_least(self, limit):
+        """返回分数不低于limit的候选下标 (按原始顺序)"""
+        start = np.searchsorted(self.sorted_scores, limit, side="left")
+        return np.sort(self.order[start:])
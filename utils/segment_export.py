@@ -0,0 +1,417 @@
+"""视频片段导出模块
+
+在后台线程中导出 [start_frame, end_frame] 范围的视频片段: 读取线程只在起点定位一次，
+随后顺序解码，通过有界队列交给写入线程编码，解码和编码互相重叠。
+进度按时间间隔节流回调，可随时取消，取消或出错时删除未完成的输出文件。
+启用stream_copy且剪切点对齐关键帧时优先无损复制压缩包，否则退回重新编码。
+批量导出时顺序解码，每帧同时分发给所有覆盖它的输出文件，输出写完即为后面的片段腾出位置。
+"""
+import heapq
+import os
+import queue
+import threading
+import time
+
+import cv2
+
+from config.constants import PIPELINE_DEFAULTS, SEGMENT_EXPORT_DEFAULTS
+from utils.sampler import seek_to_frame
+from utils.stream_copy import remux_segment
+
+
+def fourcc_for(output_path):
+    """按输出文件扩展名选择编码器"""
+    if output_path.lower().endswith('.mp4'):
+        return cv2.VideoWriter_fourcc(*'mp4v')
+    return cv2.VideoWriter_fourcc(*'XVID')
+
+
+def open_writer(output_path, fps, size):
+    """创建视频写入对象，必要时创建输出目录"""
+    output_dir = os.path.dirname(output_path)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+
+    writer = cv2.VideoWriter(output_path, fourcc_for(output_path), fps, size)
+    if not writer.isOpened():
+        raise Exception("无法创建输出视频文件")
+    return writer
+
+
+def _put_until(frames, item, cancel_event):
+    """放入队列，队列满时等待，取消后放弃"""
+    while not cancel_event.is_set():
+        try:
+            frames.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _remove_file(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+class ExportJob:
+    """后台导出任务基类
+
+    progress_callback(已处理帧数, 总帧数) 和 done_callback(状态, 错误信息) 在后台线程中调用，
+    状态为 "done"、"partial" (部分结果未能导出，错误信息说明原因)、"cancelled" 或 "error"。
+    """
+
+    def __init__(self, video_path, fps, progress_callback=None, done_callback=None, queue_size=None,
+                 progress_interval=0.2):
+        self.video_path = video_path
+        self.fps = fps
+        self.progress_callback = progress_callback
+        self.done_callback = done_callback
+        self.queue_size = queue_size or PIPELINE_DEFAULTS["queue_size"]
+        self.progress_interval = progress_interval
+
+        self._last_report = 0.0
+        self.cancel_event = threading.Event()
+        self.thread = None
+
+    @property
+    def running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self):
+        """启动后台导出"""
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        return self
+
+    def cancel(self):
+        """请求取消导出"""
+        self.cancel_event.set()
+
+    def _report(self, written, total):
+        """按时间间隔节流的进度回调"""
+        now = time.monotonic()
+        if self.progress_callback and now - self._last_report >= self.progress_interval:
+            self._last_report = now
+            self.progress_callback(written, total)
+
+    def _run(self):
+        raise NotImplementedError
+
+
+class SegmentExportJob(ExportJob):
+    """后台导出一个视频片段"""
+
+    def __init__(self, video_path, output_path, start_frame, end_frame, fps, stream_copy=False, **kwargs):
+        super().__init__(video_path, fps, **kwargs)
+        self.output_path = output_path
+        self.start_frame = start_frame
+        self.end_frame = end_frame
+        self.stream_copy = stream_copy
+
+        self.total = max(0, end_frame - start_frame + 1)
+        self.written = 0
+        # 是否通过无损复制完成
+        self.copied = False
+
+    def _write_frames(self, writer, frames, errors):
+        """写入线程: 从队列取帧编码，遇到None结束"""
+        while True:
+            frame = frames.get()
+            if frame is None:
+                break
+            # 取消或出错后只清空队列，保证读取线程不会阻塞
+            if self.cancel_event.is_set():
+                continue
+
+            try:
+                writer.write(frame)
+            except Exception as e:
+                errors.append(e)
+                self.cancel_event.set()
+                continue
+            self.written += 1
+            self._report(self.written, self.total)
+
+    def _run_stream_copy(self):
+        """尝试无损剪切，已处理 (完成或取消) 时返回True"""
+        try:
+            handled = remux_segment(self.video_path, self.output_path, self.start_frame, self.end_frame,
+                                    self.cancel_event, self._report)
+        except Exception:
+            # 输出容器不支持源编码等情况，改用重新编码
+            _remove_file(self.output_path)
+            return False
+
+        if not handled:
+            return False
+
+        self.copied = True
+        status = "cancelled" if self.cancel_event.is_set() else "done"
+        if status == "done" and self.progress_callback:
+            self.progress_callback(self.total, self.total)
+        if self.done_callback:
+            self.done_callback(status, None)
+        return True
+
+    def _run(self):
+        if self.stream_copy and self._run_stream_copy():
+            return
+
+        status, error = "done", None
+        cap = cv2.VideoCapture(self.video_path)
+        writer = None
+        try:
+            if not cap.isOpened():
+                raise Exception("无法打开源视频")
+
+            width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+            height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+            writer = open_writer(self.output_path, self.fps, (width, height))
+
+            if not seek_to_frame(cap, self.start_frame):
+                raise Exception("无法定位到起始帧")
+
+            frames = queue.Queue(maxsize=self.queue_size)
+            errors = []
+            writer_thread = threading.Thread(target=self._write_frames, args=(writer, frames, errors), daemon=True)
+            writer_thread.start()
+
+            # 顺序读取，不再逐帧定位
+            for _ in range(self.total):
+                if self.cancel_event.is_set():
+                    break
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                if not _put_until(frames, frame, self.cancel_event):
+                    break
+
+            frames.put(None)
+            writer_thread.join()
+
+            if errors:
+                raise errors[0]
+            if self.cancel_event.is_set():
+                status = "cancelled"
+            else:
+                if self.progress_callback:
+                    self.progress_callback(self.written, self.total)
+                if self.written < self.total:
+                    # 视频提前结束或解码失败，保留已写出的部分
+                    status = "partial"
+                    error = f"{self.total - self.written} 帧无法读取 (超出视频范围或解码失败)，片段不完整"
+        except Exception as e:
+            status, error = "error", str(e)
+        finally:
+            cap.release()
+            if writer is not None:
+                writer.release()
+
+        # 取消或出错时删除未完成的文件
+        if status in ("cancelled", "error") and writer is not None:
+            _remove_file(self.output_path)
+
+        if self.done_callback:
+            self.done_callback(status, error)
+
+
+class _SegmentWriter:
+    """批量导出中的一个输出文件: 独立的写入线程和有界队列"""
+
+    def __init__(self, output_path, fps, size, queue_size, expected):
+        self.output_path = output_path
+        self.expected = expected
+        self.written = 0
+        self.writer = open_writer(output_path, fps, size)
+        self.frames = queue.Queue(maxsize=queue_size)
+        self.error = None
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while True:
+            frame = self.frames.get()
+            if frame is None:
+                break
+            if self.error is None:
+                try:
+                    self.writer.write(frame)
+                    self.written += 1
+                except Exception as e:
+                    self.error = e
+        self.writer.release()
+
+    def close(self):
+        """写完队列中剩余的帧并关闭文件"""
+        self.frames.put(None)
+        self.thread.join()
+
+
+def _covered_frames(segments):
+    """按起始帧排序的片段并集的帧数"""
+    total = 0
+    covered_until = -1
+    for start, end, _ in segments:
+        if end > covered_until:
+            total += end - max(start, covered_until + 1) + 1
+            covered_until = end
+    return total
+
+
+def _plan_passes(segments, max_writers):
+    """把按起始帧排序的片段分配到各遍顺序读取中
+
+    每一遍按起始帧依次打开输出，已有输出在片段起点之前写完时即可复用其位置 (滑动窗口)；
+    片段起点处已有max_writers个输出仍在写入时推迟到下一遍，下一遍回退到其起点重新读取。
+    """
+    passes = []
+    remaining = segments
+    while remaining:
+        ends = []
+        current, deferred = [], []
+        for segment in remaining:
+            # 结束帧在本片段起点之前的输出已经关闭
+            while ends and ends[0] < segment[0]:
+                heapq.heappop(ends)
+            if len(ends) < max_writers:
+                heapq.heappush(ends, segment[1])
+                current.append(segment)
+            else:
+                deferred.append(segment)
+        passes.append(current)
+        remaining = deferred
+    return passes
+
+
+class BatchSegmentExportJob(ExportJob):
+    """顺序解码导出多个片段 (可以相互重叠)
+
+    segments为 (起始帧, 结束帧, 输出路径) 列表。按起始帧排序后顺序读取，到达片段起点时打开输出，
+    每一帧分发给所有覆盖它的输出，帧对象在各输出之间共享，不复制；输出写完即关闭，为后面的片段腾出位置。
+    同时打开的输出文件 (写入线程和编码器) 不超过max_writers个，只有同一帧上重叠的片段超过max_writers个时，
+    多出的片段才推迟到下一遍，回退到其起点重新读取。
+    没有输出需要写入时，与下一个片段起点相距超过max_gap_frames或需要回退则直接定位，否则只grab不解码。
+    无法定位或视频提前结束导致部分片段未写出或不完整时，状态为"partial"。
+    """
+
+    def __init__(self, video_path, segments, fps, max_gap_frames=300, max_writers=None, **kwargs):
+        super().__init__(video_path, fps, **kwargs)
+        self.segments = sorted(segments, key=lambda segment: (segment[0], segment[1]))
+        self.max_gap_frames = max_gap_frames
+        self.max_writers = max(1, max_writers or SEGMENT_EXPORT_DEFAULTS["max_writers"])
+        self.passes = _plan_passes(self.segments, self.max_writers)
+        self.completed = []
+        # 未能写出的片段和因视频提前结束而不完整的片段
+        self.skipped = []
+        self.truncated = []
+
+        # 需要解码的帧数为各遍片段并集的长度之和
+        self.total = sum(_covered_frames(segments) for segments in self.passes)
+        self.processed = 0
+
+    def _run(self):
+        status, error = "done", None
+        cap = cv2.VideoCapture(self.video_path)
+        active = []
+        try:
+            if not cap.isOpened():
+                raise Exception("无法打开源视频")
+
+            size = (int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+            frame_num = None
+            for segments in self.passes:
+                if self.cancel_event.is_set():
+                    break
+                frame_num = self._export_pass(cap, segments, size, frame_num, active)
+
+            errors = [segment_writer.error for segment_writer in self.completed if segment_writer.error]
+            if errors:
+                raise errors[0]
+            if self.cancel_event.is_set():
+                status = "cancelled"
+            else:
+                if self.progress_callback:
+                    self.progress_callback(self.processed, self.total)
+                if self.skipped or self.truncated:
+                    status, error = "partial", self._shortfall_message()
+        except Exception as e:
+            status, error = "error", str(e)
+        finally:
+            cap.release()
+            # 取消或出错时删除未完成的文件
+            for _, segment_writer in active:
+                segment_writer.close()
+                _remove_file(segment_writer.output_path)
+
+        if self.done_callback:
+            self.done_callback(status, error)
+
+    def _export_pass(self, cap, segments, size, frame_num, active):
+        """顺序读取一遍导出分配到本遍的片段，返回读取位置 (下一帧的帧号，未知时为None)"""
+        pending = list(reversed(segments))
+        while (pending or active) and not self.cancel_event.is_set():
+            if not active:
+                next_start = pending[-1][0]
+                if (frame_num is None or next_start < frame_num
+                        or next_start - frame_num > self.max_gap_frames):
+                    if not seek_to_frame(cap, next_start):
+                        # 无法定位时本遍剩余的片段都无法写出
+                        self.skipped.extend(output_path for _, _, output_path in reversed(pending))
+                        return None
+                    frame_num = next_start
+
+            # 打开从当前帧开始的输出
+            while pending and pending[-1][0] <= frame_num:
+                start, end, output_path = pending.pop()
+                active.append((end, _SegmentWriter(output_path, self.fps, size, self.queue_size,
+                                                   end - start + 1)))
+
+            if not active:
+                # 与下一个片段间隔较小，跳过的帧只grab不解码
+                if not cap.grab():
+                    break
+                frame_num += 1
+                continue
+
+            ret, frame = cap.read()
+            if not ret:
+                break
+            for _, segment_writer in active:
+                if not _put_until(segment_writer.frames, frame, self.cancel_event):
+                    break
+            self.processed += 1
+            self._report(self.processed, self.total)
+
+            # 关闭已写完的输出
+            for item in [item for item in active if item[0] <= frame_num]:
+                active.remove(item)
+                self._finish_writer(item[1])
+            frame_num += 1
+
+        if self.cancel_event.is_set():
+            return frame_num
+
+        # 视频提前结束时，已开始的输出按实际读到的帧保存，尚未开始的片段无法写出
+        for _, segment_writer in active:
+            self._finish_writer(segment_writer)
+        active.clear()
+        self.skipped.extend(output_path for _, _, output_path in reversed(pending))
+        return frame_num
+
+    def _finish_writer(self, segment_writer):
+        segment_writer.close()
+        self.completed.append(segment_writer)
+        if segment_writer.error is None and segment_writer.written < segment_writer.expected:
+            self.truncated.append(segment_writer.output_path)
+
+    def _shortfall_message(self):
+        """未完整导出的片段说明"""
+        parts = []
+        if self.skipped:
+            parts.append(f"{len(self.skipped)} 个片段无法定位或超出视频范围，未能导出")
+        if self.truncated:
+            parts.append(f"{len(self.truncated)} 个片段因视频提前结束而不完整")
+        return "；".join(parts)
@@ -0,0 +1,108 @@
+"""自相似矩阵循环检测模块
+
+每个采样帧压缩为一个紧凑的亮度描述子 (固定宽度的灰度缩略图，去均值后L2归一化)，
+两个描述子的点积即归一化相关系数。整段视频的自相似矩阵按块计算，内存占用只与块大小有关，
+每一行 (循环起点) 只保留间隔不小于最短循环长度的最佳终点，
+最后用非极大值抑制选出得分最高的若干循环，再用精确SSIM复核。
+"""
+import cv2
+import numpy as np
+
+from utils.fingerprint import make_thumbnail
+from utils.ssim import frame_stats, ssim_batch
+
+
+def frame_descriptor(thumbnail):
+    """把灰度缩略图转换为去均值、L2归一化的float32描述子 (纯色帧返回零向量)"""
+    vector = np.asarray(thumbnail, dtype=np.float32).ravel()
+    vector = vector - vector.mean()
+    norm = float(np.linalg.norm(vector))
+    if norm > 1e-6:
+        vector /= norm
+    return vector
+
+
+def best_loop_ends(descriptors, min_gap, max_gap=None, tile_size=1024, progress_callback=None):
+    """分块计算自相似矩阵，返回每个起点在 [min_gap, max_gap] 间隔内的最佳终点及相关系数
+
+    descriptors为 (采样帧数, 维数) 的float32数组，间隔以采样帧为单位。
+    没有可用终点的起点对应终点为-1、分数为-inf。
+    """
+    descriptors = np.ascontiguousarray(descriptors, dtype=np.float32)
+    count = len(descriptors)
+    min_gap = max(1, int(min_gap))
+    max_gap = count if max_gap is None else int(max_gap)
+
+    best_scores = np.full(count, -np.inf, dtype=np.float32)
+    best_ends = np.full(count, -1, dtype=np.int64)
+
+    for row_start in range(0, count, tile_size):
+        row_stop = min(count, row_start + tile_size)
+        rows = descriptors[row_start:row_stop]
+        row_ids = np.arange(row_start, row_stop)
+
+        col_first = row_start + min_gap
+        col_last = min(count, row_stop - 1 + max_gap + 1)
+        for col_start in range(col_first, col_last, tile_size):
+            col_stop = min(col_last, col_start + tile_size)
+            similarities = rows @ descriptors[col_start:col_stop].T
+
+            # 只有块跨越有效带边界时才需要屏蔽
+            if col_start - (row_stop - 1) < min_gap or col_stop - 1 - row_start > max_gap:
+                gaps = np.arange(col_start, col_stop)[None, :] - row_ids[:, None]
+                similarities[(gaps < min_gap) | (gaps > max_gap)] = -np.inf
+
+            cols = similarities.argmax(axis=1)
+            scores = similarities[np.arange(len(rows)), cols]
+            better = scores > best_scores[row_start:row_stop]
+            best_scores[row_start:row_stop][better] = scores[better]
+            best_ends[row_start:row_stop][better] = cols[better] + col_start
+
+        if progress_callback:
+            progress_callback(row_stop, count)
+
+    return best_scores, best_ends
+
+
+def select_loops(best_scores, best_ends, top_k, radius):
+    """按相关系数从高到低贪心选取循环，起点和终点都与已选循环相距不超过radius的视为重复"""
+    selected = []
+    for start in np.argsort(-best_scores, kind="stable").tolist():
+        if len(selected) >= top_k or not np.isfinite(best_scores[start]):
+            break
+        end = int(best_ends[start])
+        if any(abs(start - s) <= radius and abs(end - e) <= radius for s, e in selected):
+            continue
+        selected.append((start, end))
+    return selected
+
+
+def read_analysis_frame(cap, frame_num, width):
+    """定位并读取一帧，返回用于SSIM比较的灰度缩略图"""
+    cap.set(cv2.CAP_PROP_POS_FRAMES, frame_num)
+    ret, frame = cap.read()
+    if not ret:
+        return None
+    return make_thumbnail(frame, width)
+
+
+def verify_loops(video_path, frame_pairs, width):
+    """用精确SSIM复核 (起始帧, 结束帧) 列表，读取失败的返回None"""
+    cap = cv2.VideoCapture(video_path)
+    try:
+        # 按帧号顺序读取，相同帧只读一次
+        grays = {}
+        for frame_num in sorted({frame for pair in frame_pairs for frame in pair}):
+            grays[frame_num] = read_analysis_frame(cap, frame_num, width)
+    finally:
+        cap.release()
+
+    results = []
+    for start, end in frame_pairs:
+        gray1, gray2 = grays[start], grays[end]
+        if gray1 is None or gray2 is None or gray1.shape != gray2.shape:
+            results.append(None)
+            continue
+        mean, variance = frame_stats(gray2)
+        results.append(float(ssim_batch(gray1, gray2[None], mean[None], variance[None])[0]))
+    return results
@@ -0,0 +1,71 @@
+"""分段多进程解码模块
+
+把视频按时间切成若干段，每个子进程打开自己的VideoCapture，只在段起点seek一次，
+随后顺序计算本段的指纹。各段结果按顺序合并，与单进程顺序扫描的结果完全一致。
+"""
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+
+from utils.fingerprint import collect_fingerprints, fingerprint_sample
+from utils.sampler import iter_sampled_frames, seek_to_frame
+
+
+def fingerprint_shard(video_path, frame_skip, start_frame, end_frame, thumb_width=None):
+    """子进程入口: 计算 [start_frame, end_frame) 范围内采样帧的指纹"""
+    cap = cv2.VideoCapture(video_path)
+    try:
+        if not cap.isOpened() or not seek_to_frame(cap, start_frame):
+            return collect_fingerprints([])
+
+        samples = iter_sampled_frames(cap, frame_skip, start_frame=start_frame, end_frame=end_frame)
+        expected = 0 if end_frame is None else (end_frame - start_frame) // frame_skip + 1
+        return collect_fingerprints((fingerprint_sample(sample, thumb_width) for sample in samples), expected)
+    finally:
+        cap.release()
+
+
+def split_shards(total_frames, frame_skip, shard_count):
+    """按采样间隔对齐切分 [0, total_frames)，最后一段不设终点以覆盖帧数估计误差"""
+    samples = max(1, total_frames // frame_skip + 1)
+    shard_count = max(1, min(shard_count, samples))
+    bounds = [(samples * i // shard_count) * frame_skip for i in range(shard_count)]
+    return [(start, end) for start, end in zip(bounds, bounds[1:] + [None])]
+
+
+def iter_sharded_fingerprints(video_path, frame_skip, total_frames, processes, thumb_width=None,
+                              progress_callback=None, shards_per_process=4):
+    """多进程分段计算指纹，按帧号顺序逐个返回 (帧号, 打包哈希, 缩略图或None)
+
+    同时提交的分段数量受限，已完成的分段按顺序交还后即释放，内存占用与分段大小相关。
+    """
+    shards = split_shards(total_frames, frame_skip, processes * shards_per_process)
+
+    # 调用方是Tk进程中的工作线程，fork该进程并不安全，各平台统一使用spawn启动子进程
+    with ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context("spawn")) as executor:
+        futures = []
+        next_shard = 0
+        try:
+            for index, (start, end) in enumerate(shards):
+                # 保持最多 processes + 1 个分段在途
+                while next_shard < len(shards) and next_shard <= index + processes:
+                    shard_start, shard_end = shards[next_shard]
+                    futures.append(executor.submit(fingerprint_shard, video_path, frame_skip,
+                                                   shard_start, shard_end, thumb_width))
+                    next_shard += 1
+
+                result = futures[index].result()
+                futures[index] = None
+
+                for idx in range(len(result)):
+                    thumbnail = None if result.thumbnails is None else result.thumbnails[idx]
+                    yield int(result.frame_numbers[idx]), int(result.hashes[idx]), thumbnail
+
+                if progress_callback:
+                    progress_callback(end if end is not None else total_frames)
+        finally:
+            # 提前结束时取消尚未开始的分段
+            for future in futures:
+                if future is not None:
+                    future.cancel()
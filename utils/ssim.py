@@ -0,0 +1,67 @@
+"""批量SSIM模块
+
+与 skimage.metrics.structural_similarity 的默认参数一致 (7x7均匀窗口、样本协方差、
+K1=0.01、K2=0.03、uint8数据范围255，去掉边缘3像素后取平均)。
+每帧的局部均值和方差只计算一次并缓存，一个查询帧与一组缓存帧的SSIM在一次批量计算中完成。
+"""
+import cv2
+import numpy as np
+
+
+WIN_SIZE = 7
+K1 = 0.01
+K2 = 0.03
+DATA_RANGE = 255
+
+_PAD = (WIN_SIZE - 1) // 2
+_NP = WIN_SIZE * WIN_SIZE
+_COV_NORM = _NP / (_NP - 1)
+_C1 = (K1 * DATA_RANGE) ** 2
+_C2 = (K2 * DATA_RANGE) ** 2
+
+# 每次批量计算的最大帧数 (作为cv2多通道图像处理，通道数不能超过512)
+BATCH_SIZE = 64
+
+
+def _window_means(images):
+    """7x7均匀滤波并去掉边缘，images为 (h, w) 或 (h, w, 通道) 的float32数组"""
+    means = cv2.boxFilter(images, -1, (WIN_SIZE, WIN_SIZE), normalize=True,
+                          borderType=cv2.BORDER_REFLECT)
+    return means.reshape(images.shape)[_PAD:-_PAD, _PAD:-_PAD]
+
+
+def frame_stats(gray):
+    """计算单帧的局部均值和局部方差 (已去掉边缘)，返回float32数组"""
+    gray = np.asarray(gray, dtype=np.float32)
+    mean = _window_means(gray)
+    variance = _COV_NORM * (_window_means(gray * gray) - mean * mean)
+    return mean, variance
+
+
+def ssim_batch(query, stack, stack_means, stack_variances, query_stats=None):
+    """计算query与stack (帧数, h, w) 中每一帧的SSIM，stack的局部均值和方差需预先由frame_stats计算"""
+    if query_stats is None:
+        query_stats = frame_stats(query)
+    query_mean, query_variance = query_stats
+    query = np.asarray(query, dtype=np.float32)
+
+    scores = np.empty(len(stack), dtype=np.float64)
+    for start in range(0, len(stack), BATCH_SIZE):
+        stop = min(len(stack), start + BATCH_SIZE)
+
+        # 转为通道在最后的布局，一次滤波完成一批帧的互相关项
+        images = np.asarray(stack[start:stop], dtype=np.float32).transpose(1, 2, 0)
+        products = np.ascontiguousarray(images * query[:, :, None])
+        cross_means = _window_means(products).transpose(2, 0, 1)
+
+        means = np.asarray(stack_means[start:stop], dtype=np.float32)
+        variances = np.asarray(stack_variances[start:stop], dtype=np.float32)
+        covariance = _COV_NORM * (cross_means - means * query_mean)
+
+        a1 = 2 * means * query_mean + _C1
+        a2 = 2 * covariance + _C2
+        b1 = means * means + query_mean * query_mean + _C1
+        b2 = variances + query_variance + _C2
+        scores[start:stop] = ((a1 * a2) / (b1 * b2)).mean(axis=(-2, -1), dtype=np.float64)
+
+    return scores
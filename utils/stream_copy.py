@@ -0,0 +1,115 @@
+"""无损剪切模块 (可选依赖PyAV)
+
+起止点落在关键帧边界上时，直接复制压缩包到新容器而不解码、不重新编码，
+导出耗时只取决于读写速度。未安装PyAV或剪切点不对齐时返回False，由调用方改用重新编码。
+"""
+import os
+
+try:
+    import av
+except ImportError:
+    av = None
+
+
+def stream_copy_available():
+    """是否安装了PyAV"""
+    return av is not None
+
+
+def _frame_pts(stream, frame_num):
+    """帧号换算为流时间基下的pts (按平均帧率)"""
+    start = stream.start_time or 0
+    return start + int(round(frame_num / float(stream.average_rate) / float(stream.time_base)))
+
+
+def remux_segment(video_path, output_path, start_frame, end_frame, cancel_event=None, progress_callback=None):
+    """把 [start_frame, end_frame] 的视频包复制到output_path
+
+    要求起始帧是关键帧、结束帧之后紧接关键帧 (或视频结束) 且该关键帧之后没有属于本段的前导帧，否则删除输出并返回False。
+    取消时同样删除输出并返回True (已处理)，调用方通过cancel_event判断是否取消。
+    """
+    if av is None:
+        return False
+
+    with av.open(video_path) as source:
+        stream = source.streams.video[0]
+        if not stream.average_rate or not stream.time_base:
+            return False
+
+        start_pts = _frame_pts(stream, start_frame)
+        end_pts = _frame_pts(stream, end_frame)
+        next_pts = _frame_pts(stream, end_frame + 1)
+        tolerance = (next_pts - end_pts) // 2
+        total = end_frame - start_frame + 1
+
+        aligned = True
+        cancelled = False
+        copied = 0
+        offset = None
+        # 结束帧之后紧接的关键帧的pts，找到后继续检查开放GOP中的前导帧
+        boundary = None
+
+        output_dir = os.path.dirname(output_path)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+
+        source.seek(start_pts, stream=stream, backward=True, any_frame=False)
+        with av.open(output_path, "w") as target:
+            target_stream = target.add_stream_from_template(stream)
+
+            for packet in source.demux(stream):
+                if packet.pts is None:
+                    continue
+                if cancel_event is not None and cancel_event.is_set():
+                    cancelled = True
+                    break
+
+                if boundary is not None:
+                    # 开放GOP (如HEVC的CRA) 中，结束帧之前的前导帧在解码顺序上位于关键帧之后，
+                    # 复制到关键帧为止会丢失这些帧
+                    if packet.pts <= end_pts + tolerance:
+                        aligned = False
+                        break
+                    if packet.pts > boundary:
+                        break
+                    continue
+
+                if offset is None:
+                    # 跳过定位落在前一个关键帧时多出的包，第一个包必须是起始帧处的关键帧
+                    if packet.pts < start_pts - tolerance:
+                        continue
+                    if not packet.is_keyframe or abs(packet.pts - start_pts) > tolerance:
+                        aligned = False
+                        break
+                    offset = packet.dts if packet.dts is not None else packet.pts
+                elif packet.pts < start_pts - tolerance:
+                    # 开放GOP中引用前一段的前导帧
+                    aligned = False
+                    break
+
+                if packet.pts > end_pts + tolerance:
+                    # 结束帧之后的第一个包必须是紧接的关键帧
+                    aligned = packet.is_keyframe and abs(packet.pts - next_pts) <= tolerance
+                    if not aligned:
+                        break
+                    boundary = packet.pts
+                    continue
+
+                packet.pts -= offset
+                if packet.dts is not None:
+                    packet.dts -= offset
+                packet.stream = target_stream
+                target.mux(packet)
+
+                copied += 1
+                if progress_callback:
+                    progress_callback(copied, total)
+
+            aligned = aligned and offset is not None
+
+    if cancelled or not aligned:
+        try:
+            os.remove(output_path)
+        except OSError:
+            pass
+    return cancelled or aligned
@@ -0,0 +1,49 @@
+"""界面消息通道模块
+
+工作线程不直接访问Tk控件或调用update()，而是把变量更新和回调放入通道，
+由界面线程通过after()按固定间隔统一取出应用。变量更新和回调按提交顺序排在同一个队列中，
+两次回调之间对同一变量的多次更新只保留最新值，工作线程每次上报只是一次加锁的字典赋值，
+界面重绘不再拖慢分析。
+"""
+import threading
+
+from config.constants import UI_UPDATE_DEFAULTS
+
+
+class UIChannel:
+    """工作线程到Tk界面线程的消息通道，需在界面线程中创建"""
+
+    def __init__(self, widget, interval_ms=None):
+        self.widget = widget
+        self.interval_ms = interval_ms or UI_UPDATE_DEFAULTS["interval_ms"]
+        self.lock = threading.Lock()
+        # 按提交顺序排列的条目: 变量更新字典 (连续的更新合并为一个) 或 (回调, 参数)
+        self.pending = []
+        self.widget.after(self.interval_ms, self._drain)
+
+    def set(self, variable, value):
+        """设置Tk变量，与上一次回调之后的更新合并，只保留最新值"""
+        with self.lock:
+            if not self.pending or not isinstance(self.pending[-1], dict):
+                self.pending.append({})
+            self.pending[-1][variable] = value
+
+    def call(self, callback, *args):
+        """在界面线程中按提交顺序调用 callback(*args)"""
+        with self.lock:
+            self.pending.append((callback, args))
+
+    def _drain(self):
+        """按提交顺序应用变量更新和回调 (回调中设置的状态不会被之前的进度覆盖)"""
+        try:
+            with self.lock:
+                pending, self.pending = self.pending, []
+            for item in pending:
+                if isinstance(item, dict):
+                    for variable, value in item.items():
+                        variable.set(value)
+                else:
+                    callback, args = item
+                    callback(*args)
+        finally:
+            self.widget.after(self.interval_ms, self._drain)